@@ -3,11 +3,14 @@ import random
 from speakeasypy import Chatroom, EventType, Speakeasy
 
 from cred import USERNAME, PASSWORD
+from src.answer_stream import ChunkPoster
+from src.llm_gateway import get_llm_gateway
 from src.message_handler import MessageHandler
 import re
 
-from transformer import Transformer
-from vector_store.vector_store import VectorStore
+from src.transformer import Transformer
+from src.vector_store.table_schema import func
+from src.vector_store.vector_store import VectorStore
 
 DEFAULT_HOST_URL = 'https://speakeasy.ifi.uzh.ch'
 
@@ -24,8 +27,11 @@ class Agent:
         self.speakeasy.register_callback(self.on_new_room, EventType.ROOMS)
 
         self.vector_store = VectorStore()
-        self.message_handler = MessageHandler(self.vector_store)
+        self.vector_store.warm_up()
         self.transformer = Transformer(self.vector_store)
+        self.message_handler = MessageHandler(self.vector_store, self.transformer)
+        self.llm_gateway = get_llm_gateway()
+        self.llm_gateway.warm_up(func)
         self.cached_responses = {}
         self.searching_messages = [
                 "I'm looking into it...",
@@ -96,23 +102,31 @@ class Agent:
                 text_query = message
 
             response = ""
+            # LLM answers are posted sentence by sentence while they are generated
+            poster = ChunkPoster(room.post_messages)
             if factual_answer_needed:
-                response = self.message_handler.handle_factual_question(text_query, extracted_entity, extracted_relation)
+                response = self.message_handler.handle_factual_question(text_query, extracted_entity, extracted_relation,
+                                                                        poster)
                 print("factual response: " + response)
-                room.post_messages(response)
+                if not poster.posted:
+                    room.post_messages(response)
             if embedding_answer_needed:
-                response = self.message_handler.handle_embedding_question(text_query, extracted_entity, extracted_relation)
+                response = self.message_handler.handle_embedding_question(text_query, extracted_entity,
+                                                                          extracted_relation, poster)
                 print("embedding response: " + response)
-                room.post_messages(response)
+                if not poster.posted:
+                    room.post_messages(response)
             if suggestion_response_needed:
-                response = self.message_handler.handle_suggestion_question(message, extracted_entities_map)
+                response = self.message_handler.handle_suggestion_question(message, extracted_entities_map, poster)
                 print("suggestion response: " + response)
-                room.post_messages(response)
+                if not poster.posted:
+                    room.post_messages(response)
             if multimedia_answer_needed:
                 response = self.message_handler.handle_multimedia_question(extracted_m_entity)
                 room.post_messages(response)
 
             self.cached_responses[message] = response
+            print(f"LLM gateway: {self.llm_gateway.stats()}")
 
         except Exception as e:
             print(e)
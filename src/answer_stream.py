@@ -0,0 +1,95 @@
+import re
+import time
+from typing import Callable
+
+# A sentence ends at ., ! or ? (optionally followed by a closing quote or parenthesis) when whitespace and the
+# capitalized start of the next sentence follow. The end of the stream is handled by ChunkPoster.flush.
+SENTENCE_END = re.compile(r"(\S*?)[.!?][\"”’)]?(?=\s+[\"“‘(]?[A-Z])")
+# Words that end with a period without ending the sentence, lowercase and without the period
+ABBREVIATIONS = {"dr", "mr", "mrs", "ms", "prof", "st", "jr", "sr", "vs", "mt", "feat", "approx"}
+
+
+def sentence_boundary(text: str) -> int | None:
+    """
+    Position after the last sentence end in text, None if there is none. Periods after initials ("F. Coppola"),
+    abbreviations ("Dr. Strangelove") and dotted abbreviations ("U.S.") do not end a sentence.
+    """
+    boundary = None
+    for match in SENTENCE_END.finditer(text):
+        word = match.group(1).lstrip("\"“‘(").lower()
+        if match.group(0)[len(match.group(1))] == "." and (
+                (len(word) == 1 and word.isalpha()) or word in ABBREVIATIONS or "." in word):
+            continue
+        boundary = match.end()
+    return boundary
+
+
+class ChunkPoster:
+    """
+    Collects the tokens of a streamed answer and posts them in pieces: a piece ends at the last sentence boundary
+    in the buffer, or at the last word boundary once max_interval seconds passed without one.
+    """
+
+    def __init__(self, post: Callable[[str], None], max_interval: float = 2.0):
+        self.post = post
+        self.max_interval = max_interval
+        self.buffer = ""
+        self.posts = 0
+        self.started = time.perf_counter()
+        self.last_post = self.started
+        self.first_post_seconds = None
+
+    @property
+    def posted(self) -> bool:
+        return self.posts > 0
+
+    def feed(self, token: str):
+        self.buffer += token
+        boundary = sentence_boundary(self.buffer)
+        if boundary is None and time.perf_counter() - self.last_post >= self.max_interval:
+            boundary = self.buffer.rstrip().rfind(" ")
+            boundary = boundary if boundary > 0 else None
+        if boundary is not None:
+            self._post(self.buffer[:boundary])
+            self.buffer = self.buffer[boundary:]
+
+    def post_all(self, text: str):
+        """
+        Posts a complete answer (templated or cached) in one piece.
+        """
+        self._post(text)
+
+    def flush(self):
+        self._post(self.buffer)
+        self.buffer = ""
+
+    def _post(self, text: str):
+        text = text.strip()
+        if not text:
+            return
+        self.post(text)
+        self.posts += 1
+        self.last_post = time.perf_counter()
+        if self.first_post_seconds is None:
+            self.first_post_seconds = self.last_post - self.started
+
+
+def stream_answer(llm, messages: list[dict], poster: ChunkPoster) -> str:
+    """
+    Streams the completion of messages into the poster.
+
+    Args:
+        llm: the chat model, e.g. a ChatOllama
+        messages: the chat messages
+        poster: receives the tokens as they arrive
+
+    Returns:
+        the complete answer
+    """
+    tokens = []
+    for chunk in llm.stream(messages):
+        if chunk.content:
+            tokens.append(chunk.content)
+            poster.feed(chunk.content)
+    poster.flush()
+    return "".join(tokens)
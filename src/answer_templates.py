@@ -0,0 +1,80 @@
+import re
+
+from .graph_extractor import RELEVANT_SUGGESTION_PROPERTIES
+
+WIKIDATA_PROPERTY_PREFIX = "http://www.wikidata.org/prop/direct/"
+DATE_PATTERN = re.compile(r"^-?\d{4}-\d{2}-\d{2}(T[\d:]+Z?)?$")
+NUMBER_PATTERN = re.compile(r"^[+-]?\d+(\.\d+)?$")
+MAX_TEMPLATE_ANSWER_LENGTH = 100
+
+# relation URI -> (answer type the template expects, template)
+RELATION_TEMPLATES = {
+    RELEVANT_SUGGESTION_PROPERTIES["publication_date"]: ("date", "{entity} was released on {answer}."),
+    RELEVANT_SUGGESTION_PROPERTIES["director"]: ("text", "{entity} was directed by {answer}."),
+    RELEVANT_SUGGESTION_PROPERTIES["screenwriter"]: ("text", "{entity} was written by {answer}."),
+    RELEVANT_SUGGESTION_PROPERTIES["composer"]: ("text", "The music of {entity} was composed by {answer}."),
+    RELEVANT_SUGGESTION_PROPERTIES["producer"]: ("text", "{entity} was produced by {answer}."),
+    RELEVANT_SUGGESTION_PROPERTIES["production_company"]: ("text", "{entity} was produced by {answer}."),
+    RELEVANT_SUGGESTION_PROPERTIES["film_editor"]: ("text", "{entity} was edited by {answer}."),
+    RELEVANT_SUGGESTION_PROPERTIES["director_of_photography"]: (
+        "text", "The director of photography of {entity} is {answer}."),
+    RELEVANT_SUGGESTION_PROPERTIES["genre"]: ("text", "The genre of {entity} is {answer}."),
+    RELEVANT_SUGGESTION_PROPERTIES["award_received"]: ("text", "{entity} received the {answer}."),
+    RELEVANT_SUGGESTION_PROPERTIES["nominated_for"]: ("text", "{entity} was nominated for the {answer}."),
+    RELEVANT_SUGGESTION_PROPERTIES["narrative_location"]: ("text", "{entity} is set in {answer}."),
+    RELEVANT_SUGGESTION_PROPERTIES["main_subject"]: ("text", "{entity} is about {answer}."),
+    RELEVANT_SUGGESTION_PROPERTIES["after_a_work_by"]: ("text", "{entity} is based on a work by {answer}."),
+    RELEVANT_SUGGESTION_PROPERTIES["fsk_rating"]: ("text", "{entity} has an FSK rating of {answer}."),
+    WIKIDATA_PROPERTY_PREFIX + "P161": ("text", "{answer} is a cast member of {entity}."),
+    WIKIDATA_PROPERTY_PREFIX + "P495": ("text", "The country of origin of {entity} is {answer}."),
+    WIKIDATA_PROPERTY_PREFIX + "P364": ("text", "The original language of {entity} is {answer}."),
+    WIKIDATA_PROPERTY_PREFIX + "P2047": ("number", "{entity} runs for {answer} minutes."),
+}
+# Used for every other relation, and when the answer does not have the type the relation template expects
+GENERIC_TEMPLATE = "The {relation} of {entity} is {answer}."
+
+
+def answer_type(answer: str) -> str:
+    if DATE_PATTERN.match(answer):
+        return "date"
+    if NUMBER_PATTERN.match(answer):
+        return "number"
+    return "text"
+
+
+class AnswerTemplates:
+    """
+    Turns simple answers (one short value for a resolved entity and relation) into a sentence without an LLM
+    call. The answer is inserted verbatim, so the factual answer is always contained exactly.
+    """
+
+    def __init__(self, entity2label):
+        self.entity2label = entity2label
+
+    def render(self, entity_uri: str, relation_uri: str, values: list[str]) -> str | None:
+        """
+        Args:
+            entity_uri: the resolved subject
+            relation_uri: the resolved relation
+            values: the answer values
+
+        Returns:
+            the templated answer, None if the answer is not simple enough and should go to the LLM
+        """
+        if len(values) != 1 or not values[0].strip() or len(values[0]) > MAX_TEMPLATE_ANSWER_LENGTH:
+            return None
+        entity_label = self.entity2label.get(str(entity_uri))
+        if not entity_label:
+            return None
+
+        answer = values[0].strip()
+        expected_type, template = RELATION_TEMPLATES.get(str(relation_uri), (None, None))
+        if template is None or answer_type(answer) != expected_type:
+            relation_label = self.entity2label.get(str(relation_uri))
+            if not relation_label:
+                return None
+            template = GENERIC_TEMPLATE
+        else:
+            relation_label = ""
+        sentence = template.format(entity=entity_label, relation=relation_label, answer=answer)
+        return sentence[0].upper() + sentence[1:]
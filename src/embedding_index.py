@@ -0,0 +1,339 @@
+import os
+import time
+
+import numpy as np
+
+
+def top_k_smallest(values: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k smallest values along the last axis, sorted ascending. Uses a partial sort
+    (argpartition) so only the k winners get fully sorted.
+    """
+    k = min(k, values.shape[-1])
+    if k == values.shape[-1]:
+        return np.argsort(values, axis=-1)
+    candidates = np.argpartition(values, k - 1, axis=-1)[..., :k]
+    order = np.argsort(np.take_along_axis(values, candidates, axis=-1), axis=-1)
+    return np.take_along_axis(candidates, order, axis=-1)
+
+
+def squared_distances(queries: np.ndarray, vectors: np.ndarray, vector_norms: np.ndarray | None = None) -> np.ndarray:
+    """
+    Squared euclidean distances between every query row and every vector row via one matrix multiply.
+    """
+    queries = np.atleast_2d(queries).astype(np.float32, copy=False)
+    if vector_norms is None:
+        vector_norms = np.einsum("ij,ij->i", vectors, vectors)
+    query_norms = np.einsum("ij,ij->i", queries, queries)
+    distances = query_norms[:, None] - 2.0 * (queries @ vectors.T) + vector_norms[None, :]
+    return np.maximum(distances, 0.0, out=distances)
+
+
+def merge_top_k(best_ids: np.ndarray, best_distances: np.ndarray, block_ids: np.ndarray,
+                block_distances: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Merges the running top k (ids and distances per query row) with the top k of the next block.
+    """
+    merged_ids = np.concatenate([best_ids, block_ids], axis=1)
+    merged_distances = np.concatenate([best_distances, block_distances], axis=1)
+    keep = top_k_smallest(merged_distances, k)
+    return np.take_along_axis(merged_ids, keep, axis=1), np.take_along_axis(merged_distances, keep, axis=1)
+
+
+def blocked_top_k(queries: np.ndarray, vectors: np.ndarray, k: int, vector_norms: np.ndarray | None = None,
+                  query_chunk_size: int = 256, vector_chunk_size: int = 65_536) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Top k nearest vectors for every query row. Queries and vectors are processed in blocks, each block is
+    one matrix multiply and only the running top k per query is kept, so memory stays bounded by
+    query_chunk_size * vector_chunk_size distances regardless of the number of queries.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (ids, distances), both of shape (num_queries, k).
+    """
+    queries = np.atleast_2d(queries).astype(np.float32, copy=False)
+    k = min(k, len(vectors))
+    if vector_norms is None:
+        vector_norms = np.concatenate([np.einsum("ij,ij->i", vectors[start:start + vector_chunk_size],
+                                                 vectors[start:start + vector_chunk_size])
+                                       for start in range(0, len(vectors), vector_chunk_size)])
+    all_ids = np.empty((len(queries), k), dtype=np.int64)
+    all_distances = np.empty((len(queries), k), dtype=np.float32)
+
+    for query_start in range(0, len(queries), query_chunk_size):
+        query_chunk = queries[query_start:query_start + query_chunk_size]
+        best_ids = np.empty((len(query_chunk), 0), dtype=np.int64)
+        best_distances = np.empty((len(query_chunk), 0), dtype=np.float32)
+        for vector_start in range(0, len(vectors), vector_chunk_size):
+            vector_chunk = vectors[vector_start:vector_start + vector_chunk_size]
+            distances = squared_distances(query_chunk, vector_chunk,
+                                          vector_norms[vector_start:vector_start + len(vector_chunk)])
+            block_best = top_k_smallest(distances, k)
+            best_ids, best_distances = merge_top_k(best_ids, best_distances, block_best + vector_start,
+                                                   np.take_along_axis(distances, block_best, axis=1), k)
+        all_ids[query_start:query_start + len(query_chunk)] = best_ids
+        all_distances[query_start:query_start + len(query_chunk)] = np.sqrt(best_distances)
+
+    return all_ids, all_distances
+
+
+class IVFIndex:
+    """
+    Inverted file index over an embedding matrix, in pure NumPy.
+
+    The vectors are clustered with k-means into `num_lists` lists. A search only scores the vectors of the
+    `nprobe` lists whose centroids are closest to the query, so nprobe trades recall for latency
+    (nprobe = num_lists is an exact search).
+    """
+
+    def __init__(self, centroids: np.ndarray, list_offsets: np.ndarray, list_ids: np.ndarray):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+
+    @property
+    def num_lists(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, num_lists: int | None = None, iterations: int = 10,
+              sample_size: int = 100_000, seed: int = 0, chunk_size: int = 65_536) -> "IVFIndex":
+        num_vectors = len(vectors)
+        num_lists = num_lists or max(1, int(np.sqrt(num_vectors)))
+        rng = np.random.default_rng(seed)
+
+        sample = vectors[rng.choice(num_vectors, size=min(num_vectors, max(sample_size, num_lists)), replace=False)]
+        sample = np.asarray(sample, dtype=np.float32)
+        centroids = sample[rng.choice(len(sample), size=num_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmin(squared_distances(sample, centroids), axis=1)
+            for list_id in range(num_lists):
+                members = sample[assignment == list_id]
+                if len(members) > 0:
+                    centroids[list_id] = members.mean(axis=0)
+
+        assignment = np.empty(num_vectors, dtype=np.int64)
+        for start in range(0, num_vectors, chunk_size):
+            chunk = np.asarray(vectors[start:start + chunk_size], dtype=np.float32)
+            assignment[start:start + chunk_size] = np.argmin(squared_distances(chunk, centroids), axis=1)
+
+        list_ids = np.argsort(assignment, kind="stable")
+        list_offsets = np.zeros(num_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=num_lists), out=list_offsets[1:])
+        return cls(centroids, list_offsets, list_ids)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        with np.load(path) as data:
+            return cls(data["centroids"], data["list_offsets"], data["list_ids"])
+
+    def save(self, path: str):
+        np.savez(path, centroids=self.centroids, list_offsets=self.list_offsets, list_ids=self.list_ids)
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        probe_lists = top_k_smallest(squared_distances(query, self.centroids)[0], nprobe)
+        return np.concatenate([self.list_ids[self.list_offsets[list_id]:self.list_offsets[list_id + 1]]
+                               for list_id in probe_lists])
+
+    def search(self, query: np.ndarray, vectors: np.ndarray, k: int, nprobe: int = 8,
+               vector_norms: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        candidate_ids = self.candidates(query, nprobe)
+        norms = vector_norms[candidate_ids] if vector_norms is not None else None
+        distances = squared_distances(query, vectors[candidate_ids], norms)[0]
+        best = top_k_smallest(distances, k)
+        return candidate_ids[best], np.sqrt(distances[best])
+
+
+def load_or_build_ivf_index(embeddings_path: str, vectors: np.ndarray, num_lists: int | None = None) -> IVFIndex:
+    """
+    Loads the IVF index persisted next to the embedding file (e.g. entity_embeds.ivf.npz), rebuilding it
+    when the embeddings are newer than the index.
+    """
+    index_path = os.path.splitext(embeddings_path)[0] + ".ivf.npz"
+    if os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(embeddings_path):
+        return IVFIndex.load(index_path)
+
+    print(f"Building IVF index for {embeddings_path}...")
+    index = IVFIndex.build(vectors, num_lists)
+    index.save(index_path)
+    return index
+
+
+class QuantizedMatrix:
+    """
+    Reduced precision copy of an embedding matrix that is searched without going back to float32.
+
+    float16 halves the memory, int8 (symmetric, one scale per row) quarters it. Dot products are computed on
+    the stored values with a float32 accumulator: a single query streams through einsum without any copy, a
+    block of queries goes through one matmul that casts only the rows it is given. int8 results are scaled per
+    row afterwards (x . q = scale * (c . q)). The norms come from the quantized data too, so the float32 matrix
+    is only read for the candidates a caller re-scores. search() walks queries and rows in blocks, so memory
+    stays bounded by query_chunk_size * row_chunk_size.
+    """
+
+    def __init__(self, data: np.ndarray, scale: np.ndarray | None = None, chunk_size: int = 65_536):
+        self.data = data
+        self.scale = scale
+        self.chunk_size = chunk_size
+        self.norms = self._norms()
+
+    @classmethod
+    def quantize(cls, vectors: np.ndarray, dtype: str, chunk_size: int = 65_536) -> "QuantizedMatrix":
+        if dtype == "float16":
+            return cls(np.asarray(vectors, dtype=np.float16))
+        if dtype == "int8":
+            scale = np.empty(len(vectors), dtype=np.float32)
+            data = np.empty(vectors.shape, dtype=np.int8)
+            for start in range(0, len(vectors), chunk_size):
+                chunk = np.asarray(vectors[start:start + chunk_size], dtype=np.float32)
+                chunk_scale = np.abs(chunk).max(axis=1) / 127.0
+                chunk_scale[chunk_scale == 0] = 1.0
+                scale[start:start + len(chunk)] = chunk_scale
+                data[start:start + len(chunk)] = np.round(chunk / chunk_scale[:, None])
+            return cls(data, scale)
+        raise ValueError(f"Unsupported quantization: {dtype}")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "QuantizedMatrix":
+        data = np.load(path, mmap_mode="r" if mmap else None)
+        scale_path = path.replace(".npy", ".scale.npy")
+        return cls(data, np.load(scale_path) if os.path.exists(scale_path) else None)
+
+    def save(self, path: str):
+        np.save(path, self.data)
+        if self.scale is not None:
+            np.save(path.replace(".npy", ".scale.npy"), self.scale)
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def _norms(self) -> np.ndarray:
+        norms = np.empty(len(self.data), dtype=np.float32)
+        for start in range(0, len(self.data), self.chunk_size):
+            chunk = self.data[start:start + self.chunk_size]
+            norms[start:start + len(chunk)] = np.einsum("ij,ij->i", chunk, chunk, dtype=np.float32, casting="unsafe")
+        if self.scale is not None:
+            norms *= self.scale ** 2
+        return norms
+
+    def dot(self, queries: np.ndarray, ids: np.ndarray | slice | None = None) -> np.ndarray:
+        """
+        Dot products of every query row with every stored row (or the rows in ids, an index array or a slice),
+        shape (num_queries, rows). Several queries cast the selected rows to float32 once, so pass a block of
+        rows rather than the whole matrix.
+        """
+        queries = np.atleast_2d(queries).astype(np.float32, copy=False)
+        data = self.data if ids is None else self.data[ids]
+        if len(queries) == 1:
+            dots = np.einsum("ij,j->i", data, queries[0], dtype=np.float32, casting="unsafe")[None, :]
+        else:
+            dots = np.matmul(queries, data.T, dtype=np.float32)
+        if self.scale is not None:
+            dots *= self.scale if ids is None else self.scale[ids]
+        return dots
+
+    def squared_distances(self, queries: np.ndarray, ids: np.ndarray | slice | None = None) -> np.ndarray:
+        queries = np.atleast_2d(queries).astype(np.float32, copy=False)
+        norms = self.norms if ids is None else self.norms[ids]
+        distances = np.einsum("ij,ij->i", queries, queries)[:, None] - 2.0 * self.dot(queries, ids) + norms[None, :]
+        return np.maximum(distances, 0.0, out=distances)
+
+    def search(self, queries: np.ndarray, vectors: np.ndarray | None, k: int, rescore_factor: int = 10,
+               ids: np.ndarray | None = None, query_chunk_size: int = 256,
+               row_chunk_size: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Top k (ids and distances) per query, scored on the quantized data and optionally restricted to the rows
+        in ids. With vectors, k * rescore_factor candidates are re-scored exactly against their float32 rows,
+        which only reads those rows. Queries and rows are processed in blocks like blocked_top_k.
+        """
+        queries = np.atleast_2d(queries).astype(np.float32, copy=False)
+        row_chunk_size = row_chunk_size or self.chunk_size
+        num_rows = len(self.data) if ids is None else len(ids)
+        k = min(k, num_rows)
+        num_candidates = min(k * rescore_factor, num_rows) if vectors is not None else k
+        top_ids = np.empty((len(queries), k), dtype=np.int64)
+        top_distances = np.empty((len(queries), k), dtype=np.float32)
+
+        for query_start in range(0, len(queries), query_chunk_size):
+            query_chunk = queries[query_start:query_start + query_chunk_size]
+            best_ids = np.empty((len(query_chunk), 0), dtype=np.int64)
+            best_distances = np.empty((len(query_chunk), 0), dtype=np.float32)
+            for row_start in range(0, num_rows, row_chunk_size):
+                row_end = min(row_start + row_chunk_size, num_rows)
+                block_ids = np.arange(row_start, row_end) if ids is None else ids[row_start:row_end]
+                distances = self.squared_distances(query_chunk,
+                                                   slice(row_start, row_end) if ids is None else block_ids)
+                block_best = top_k_smallest(distances, num_candidates)
+                best_ids, best_distances = merge_top_k(best_ids, best_distances, block_ids[block_best],
+                                                       np.take_along_axis(distances, block_best, axis=1),
+                                                       num_candidates)
+
+            if vectors is not None:
+                # Sorted candidates read the (memory-mapped) float32 rows in file order
+                candidates = np.sort(best_ids, axis=1)
+                rows = np.asarray(vectors[candidates.ravel()], dtype=np.float32).reshape(*candidates.shape, -1)
+                differences = rows - query_chunk[:, None, :]
+                best_distances = np.einsum("qcd,qcd->qc", differences, differences)
+                best = top_k_smallest(best_distances, k)
+                best_ids = np.take_along_axis(candidates, best, axis=1)
+                best_distances = np.take_along_axis(best_distances, best, axis=1)
+            top_ids[query_start:query_start + len(query_chunk)] = best_ids
+            top_distances[query_start:query_start + len(query_chunk)] = np.sqrt(best_distances)
+        return top_ids, top_distances
+
+
+def load_or_build_quantized(embeddings_path: str, vectors: np.ndarray, dtype: str, mmap: bool = True) -> QuantizedMatrix:
+    """
+    Loads the quantized copy persisted next to the embedding file (e.g. entity_embeds.int8.npy), rebuilding it
+    when the embeddings are newer or the copy still has the old per-dimension int8 scale.
+    """
+    path = os.path.splitext(embeddings_path)[0] + f".{dtype}.npy"
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(embeddings_path):
+        quantized = QuantizedMatrix.load(path, mmap)
+        if quantized.scale is None or len(quantized.scale) == len(quantized.data):
+            return quantized
+
+    print(f"Building {dtype} copy of {embeddings_path}...")
+    QuantizedMatrix.quantize(vectors, dtype).save(path)
+    return QuantizedMatrix.load(path, mmap)
+
+
+def benchmark_quantization(entity_embeddings_path: str, relation_embeddings_path: str, num_queries: int = 200,
+                           k: int = 10, seed: int = 0):
+    """
+    Compares float16/int8 search (with and without float32 re-scoring) against the float32 baseline on
+    random (entity, relation) queries: memory, recall@k, top-1 agreement and latency.
+    """
+    entities = np.load(entity_embeddings_path, mmap_mode="r")
+    relations = np.load(relation_embeddings_path, mmap_mode="r")
+    rng = np.random.default_rng(seed)
+    queries = (entities[rng.integers(len(entities), size=num_queries)]
+               + relations[rng.integers(len(relations), size=num_queries)]).astype(np.float32)
+    norms = np.einsum("ij,ij->i", entities, entities)
+
+    start = time.perf_counter()
+    baseline = np.stack([top_k_smallest(squared_distances(query, entities, norms)[0], k) for query in queries])
+    baseline_time = (time.perf_counter() - start) / num_queries
+    print(f"float32: {entities.nbytes / 2 ** 20:.1f} MiB, {baseline_time * 1000:.2f} ms/query")
+
+    for dtype in ("float16", "int8"):
+        quantized = QuantizedMatrix.quantize(entities, dtype)
+        start = time.perf_counter()
+        approximate = np.stack([top_k_smallest(quantized.squared_distances(query)[0], k) for query in queries])
+        approximate_time = (time.perf_counter() - start) / num_queries
+        start = time.perf_counter()
+        rescored, _ = quantized.search(queries, entities, k)
+        rescored_time = (time.perf_counter() - start) / num_queries
+
+        saved = 1 - quantized.nbytes / entities.nbytes
+        print(f"{dtype}: {quantized.nbytes / 2 ** 20:.1f} MiB ({saved:.0%} saved)")
+        for name, result, elapsed in (("no re-scoring", approximate, approximate_time),
+                                      ("re-scored", rescored, rescored_time)):
+            recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(result, baseline)])
+            top1 = np.mean(result[:, 0] == baseline[:, 0])
+            print(f"  {name}: recall@{k} {recall:.3f}, top-1 agreement {top1:.3f}, {elapsed * 1000:.2f} ms/query")
+
+
+if __name__ == "__main__":
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+    benchmark_quantization(os.path.join(data_dir, "entity_embeds.npy"), os.path.join(data_dir, "relation_embeds.npy"))
@@ -1,20 +1,46 @@
 import os
+import sys
+import time
 
 import numpy as np
-from sklearn.metrics import pairwise_distances
-from rdflib import URIRef
+
+from .embedding_index import blocked_top_k, load_or_build_ivf_index, load_or_build_quantized, squared_distances, top_k_smallest
+from .term_dictionary import get_term_dictionaries
+from .type_partitions import load_or_build_type_partitions
 
 
 class EmbeddingSearch:
-    def __init__(self, vector_store):
+    def __init__(self, vector_store, graph_db=None, approximate: bool = False, nprobe: int = 8, mmap: bool = True,
+                 quantization: str | None = None, rescore_factor: int = 10):
         self.vector_store = vector_store
         self.base_path = os.path.dirname(os.path.dirname(__file__))
-        self.entity_embeddings = np.load(os.path.join(self.base_path, 'data', 'entity_embeds.npy'))
-        self.relation_embeddings = np.load(os.path.join(self.base_path, 'data', 'relation_embeds.npy'))
+        self.entity_embeddings_path = os.path.join(self.base_path, 'data', 'entity_embeds.npy')
+        # Memory-mapped matrices are shared between worker processes through the page cache
+        mmap_mode = 'r' if mmap else None
+        self.entity_embeddings = np.load(self.entity_embeddings_path, mmap_mode=mmap_mode)
+        self.relation_embeddings = np.load(os.path.join(self.base_path, 'data', 'relation_embeds.npy'),
+                                           mmap_mode=mmap_mode)
         self.entity2id, self.relation2id = self.load_mappings()
+        self.id2relation = {relation_id: relation for relation, relation_id in self.relation2id.items()}
+        self.id2entity = get_term_dictionaries().id2entity
+        self.entity2label = get_term_dictionaries().entity2label
+        # Optional float16/int8 copy that is searched directly, only the best candidates are re-scored in float32
+        self.rescore_factor = rescore_factor
+        self.quantized_embeddings = load_or_build_quantized(self.entity_embeddings_path, self.entity_embeddings,
+                                                            quantization, mmap) if quantization else None
+        # With a quantized copy the float32 matrix is only read for re-scored rows, so its norms are not needed
+        self.entity_norms = np.einsum("ij,ij->i", self.entity_embeddings, self.entity_embeddings) \
+            if self.quantized_embeddings is None else None
+        # Optional IVF index persisted next to entity_embeds.npy, nprobe is the recall/latency knob
+        self.nprobe = nprobe
+        self.ivf_index = load_or_build_ivf_index(self.entity_embeddings_path, self.entity_embeddings) if approximate else None
+        # With the graph available, searches only score entities of the types in the relation's range
+        self.type_partitions = load_or_build_type_partitions(self.entity_embeddings_path, graph_db, self.entity2id,
+                                                             list(self.relation2id)) if graph_db else None
 
     def load_mappings(self):
-        entity2id = {}
+        # Entity ids come from the shared term dictionary, the few relations stay in a dict
+        entity2id = get_term_dictionaries().entity2id
         relation2id = {}
 
         with open(os.path.join(self.base_path, 'data', 'relation_ids.del')) as f:
@@ -22,28 +48,150 @@ class EmbeddingSearch:
                 idx, name = line.strip().split()
                 relation2id[name] = int(idx)
 
-        with open(os.path.join(self.base_path, 'data', 'entity_ids.del')) as f:
-            for line in f:
-                idx, name = line.strip().split()
-                entity2id[name] = int(idx)
-
         return entity2id, relation2id
 
-    def nearest_neighbor(self, entity_uri, relation_uri) ->  tuple[str, str] | None:
-        try:
-            relation_vector = self.relation_embeddings[self.relation2id[relation_uri]]
-            entity_vector = self.entity_embeddings[self.entity2id[entity_uri]]
+    def top_k(self, entity_uri, relation_uri, k=5) -> list[tuple[str, str, float]]:
+        """
+        Finds the k entities closest to entity + relation in the embedding space.
+
+        Returns:
+            list[tuple[str, str, float]]: (label, entity URI, distance) sorted by distance.
+        """
+        relation_vector = self.relation_embeddings[self.relation2id[relation_uri]]
+        entity_vector = self.entity_embeddings[self.entity2id[entity_uri]]
+        target = entity_vector + relation_vector
+        partition = self.partition_for_relation(relation_uri)
+
+        if self.quantized_embeddings is not None and (partition is not None or self.ivf_index is None):
+            top_indices, top_distances = self.quantized_embeddings.search(target, self.entity_embeddings, k,
+                                                                          self.rescore_factor, partition)
+            top_indices, top_distances = top_indices[0], top_distances[0]
+        elif partition is not None:
+            distances = squared_distances(target, self.entity_embeddings[partition], self.entity_norms[partition])[0]
+            best = top_k_smallest(distances, k)
+            top_indices, top_distances = partition[best], np.sqrt(distances[best])
+        elif self.ivf_index is not None:
+            top_indices, top_distances = self.ivf_index.search(target, self.entity_embeddings, k, self.nprobe,
+                                                               self.entity_norms)
+        else:
+            distances = squared_distances(target, self.entity_embeddings, self.entity_norms)[0]
+            top_indices = top_k_smallest(distances, k)
+            top_distances = np.sqrt(distances[top_indices])
+
+        result = []
+        for index, distance in zip(top_indices.tolist(), top_distances.tolist()):
+            entity = self.id2entity[index]
+            result.append((self.entity2label.get(entity), entity, distance))
+        return result
+
+    def partition_for_relation(self, relation_uri) -> np.ndarray | None:
+        """
+        Entity ids of the type partition implied by the relation's range, None to search all entities.
+        """
+        partition = self.type_partitions.partition_for_relation(relation_uri) if self.type_partitions else None
+        return partition if partition is not None and len(partition) > 0 else None
+
+    def top_k_batch(self, entity_ids, relation_ids, k=5, query_chunk_size=256,
+                    entity_chunk_size=65_536) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Top k neighbours of head + relation for many (entity id, relation id) pairs at once. All targets are
+        built as one matrix; the queries of each relation are scored together, in blocks, against the type
+        partition of that relation's range (or the quantized copy), so thousands of queries run as a few large
+        matrix multiplies with bounded memory.
 
-            target = np.atleast_2d(entity_vector+relation_vector)
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (entity ids, distances), both of shape (len(entity_ids), k). Rows
+            whose partition has fewer than k entities are padded with id -1 and distance inf.
+        """
+        entity_ids, relation_ids = np.asarray(entity_ids), np.asarray(relation_ids)
+        targets = (self.entity_embeddings[entity_ids] + self.relation_embeddings[relation_ids]).astype(np.float32)
+        k = min(k, len(self.entity_embeddings))
+        top_ids = np.full((len(targets), k), -1, dtype=np.int64)
+        top_distances = np.full((len(targets), k), np.inf, dtype=np.float32)
 
-            distances = pairwise_distances(target, self.entity_embeddings)
+        for relation_id in np.unique(relation_ids).tolist():
+            rows = np.flatnonzero(relation_ids == relation_id)
+            partition = self.partition_for_relation(self.id2relation[relation_id])
+            if self.quantized_embeddings is not None:
+                ids, distances = self.quantized_embeddings.search(targets[rows], self.entity_embeddings, k,
+                                                                  self.rescore_factor, partition, query_chunk_size,
+                                                                  entity_chunk_size)
+            elif partition is not None:
+                ids, distances = blocked_top_k(targets[rows], self.entity_embeddings[partition], k,
+                                               self.entity_norms[partition], query_chunk_size, entity_chunk_size)
+                ids = partition[ids]
+            else:
+                ids, distances = blocked_top_k(targets[rows], self.entity_embeddings, k, self.entity_norms,
+                                               query_chunk_size, entity_chunk_size)
+            top_ids[rows, :ids.shape[1]] = ids
+            top_distances[rows, :ids.shape[1]] = distances
+        return top_ids, top_distances
 
-            top_index = np.argmin(distances)
+    def nearest_neighbors(self, pairs: list[tuple[str, str]], k=1) -> list[list[tuple[str, str, float]]]:
+        """
+        URI-level wrapper around top_k_batch. Pairs with an unknown entity or relation get an empty result.
 
-            id2entity = {idx: name for name, idx in self.entity2id.items()}
-            top_entity = id2entity[top_index]
+        Returns:
+            list[list[tuple[str, str, float]]]: (label, entity URI, distance) per pair, sorted by distance.
+        """
+        known = [index for index, (entity_uri, relation_uri) in enumerate(pairs)
+                 if entity_uri in self.entity2id and relation_uri in self.relation2id]
+        results = [[] for _ in pairs]
+        if not known:
+            return results
+
+        top_ids, top_distances = self.top_k_batch([self.entity2id[pairs[index][0]] for index in known],
+                                                  [self.relation2id[pairs[index][1]] for index in known], k)
+        for index, ids, distances in zip(known, top_ids.tolist(), top_distances.tolist()):
+            for entity_id, distance in zip(ids, distances):
+                if entity_id < 0:
+                    break
+                entity = self.id2entity[entity_id]
+                results[index].append((self.entity2label.get(entity), entity, distance))
+        return results
+
+    def nearest_neighbor(self, entity_uri, relation_uri) ->  tuple[str, str] | None:
+        try:
+            top_label, top_entity, _ = self.top_k(entity_uri, relation_uri, k=1)[0]
 
             print("top_entity: " + top_entity)
-            return self.vector_store.entity2label.get(URIRef(top_entity)), str(top_entity)
+            return top_label, top_entity
         except Exception as e:
-            return None, None
\ No newline at end of file
+            return None, None
+
+
+def evaluate(embedding_search: EmbeddingSearch, graph_db, num_triples: int = 10_000, k: int = 10, seed: int = 0):
+    """
+    Bulk link prediction on triples of the graph: for every sampled (head, relation, tail) the tail is looked up
+    among the top k neighbours of head + relation, all in one top_k_batch call. Prints hits@1, hits@k and the
+    throughput.
+    """
+    snapshot = graph_db.snapshot
+    rng = np.random.default_rng(seed)
+    sample = snapshot.triples[np.sort(rng.choice(len(snapshot.triples), size=min(len(snapshot.triples),
+                                                                                  num_triples * 20), replace=False))]
+    heads, relations, tails = [], [], []
+    for head, relation, tail in sample.tolist():
+        head, relation, tail = (str(snapshot.term(term_id)) for term_id in (head, relation, tail))
+        if head in embedding_search.entity2id and tail in embedding_search.entity2id \
+                and relation in embedding_search.relation2id:
+            heads.append(embedding_search.entity2id[head])
+            relations.append(embedding_search.relation2id[relation])
+            tails.append(embedding_search.entity2id[tail])
+            if len(heads) == num_triples:
+                break
+
+    start = time.perf_counter()
+    top_ids, _ = embedding_search.top_k_batch(heads, relations, k)
+    elapsed = time.perf_counter() - start
+    tails = np.array(tails)[:, None]
+    print(f"{len(heads)} triples in {elapsed:.2f}s ({len(heads) / max(elapsed, 1e-9):.0f} queries/sec): "
+          f"hits@1 {np.mean(top_ids[:, :1] == tails):.3f}, hits@{k} {np.mean(np.any(top_ids == tails, axis=1)):.3f}")
+
+
+if __name__ == "__main__":
+    # Usage: python -m src.embedding_search [num_triples]
+    from .graph_db import GraphDB
+
+    graph = GraphDB()
+    evaluate(EmbeddingSearch(None, graph), graph, int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
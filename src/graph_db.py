@@ -1,43 +1,63 @@
 import os
 import csv
+import sys
 
 import re
 import rdflib
 from rdflib import Graph, RDFS, URIRef
 from rdflib.plugins.sparql.processor import prepareQuery
 
-
+from .graph_extractor import GraphExtractor, RELEVANT_MOVIE_TYPES, RELEVANT_SUGGESTION_PROPERTIES, build_snapshot
+from .graph_snapshot import GraphSnapshot
+from .term_dictionary import get_term_dictionaries
+from .triple_store import TripleStore
 
 class GraphDB:
-    def __init__(self):
-        self.graph = Graph()
+    def __init__(self, ingest_workers: int | None = None):
+        # With more than one worker a missing snapshot is built by parsing graph.nt in a process pool.
+        # Defaults to $GRAPH_INGEST_WORKERS or the number of CPUs; 1 parses with rdflib instead.
+        self.ingest_workers = ingest_workers or int(os.getenv("GRAPH_INGEST_WORKERS", os.cpu_count() or 1))
+        self._graph = None
         src_dir = os.path.dirname(__file__)
         base_dir = os.path.dirname(src_dir)
-        graph_path = os.path.join(base_dir, "data", "graph.nt")
+        self.graph_path = os.path.join(base_dir, "data", "graph.nt")
         self.relevant_suggestion_properties = {
-            "instance_of": rdflib.term.URIRef("http://www.wikidata.org/prop/direct/P31"),
-            "publication_date": rdflib.term.URIRef("http://www.wikidata.org/prop/direct/P577"),
-            "director": rdflib.term.URIRef("http://www.wikidata.org/prop/direct/P57"),
-            "genre": rdflib.term.URIRef("http://www.wikidata.org/prop/direct/P136"),
-            "award_received": rdflib.term.URIRef("http://www.wikidata.org/prop/direct/P166"),
-            "main_subject": rdflib.term.URIRef("http://www.wikidata.org/prop/direct/P921"),
-            "production_company": rdflib.term.URIRef("http://www.wikidata.org/prop/direct/P272"),
-            "after_a_work_by": rdflib.term.URIRef("http://www.wikidata.org/prop/direct/P1877"),
-            "narrative_location": rdflib.term.URIRef("http://www.wikidata.org/prop/direct/P840"),
-            "fsk_rating": rdflib.term.URIRef("http://www.wikidata.org/prop/direct/P1981"),
-            "composer": rdflib.term.URIRef("http://www.wikidata.org/prop/direct/P86"),
-            "producer": rdflib.term.URIRef("http://www.wikidata.org/prop/direct/P162"),
-            "director_of_photography": rdflib.term.URIRef("http://www.wikidata.org/prop/direct/P344"),
-            "screenwriter": rdflib.term.URIRef("http://www.wikidata.org/prop/direct/P58"),
-            "film_editor": rdflib.term.URIRef("http://www.wikidata.org/prop/direct/P1040"),
-            "nominated_for": rdflib.term.URIRef("http://www.wikidata.org/prop/direct/P1411"),
-            "sound_designer": rdflib.term.URIRef("http://www.wikidata.org/prop/direct/P5028"),
-            "movement": rdflib.term.URIRef("http://www.wikidata.org/prop/direct/P135"),
+            name: URIRef(uri) for name, uri in RELEVANT_SUGGESTION_PROPERTIES.items()
         }
+        self.load_graph()
+
+    def load_graph(self):
         print('Loading Graph...')
-        self.graph.parse(graph_path, format="nt")
-        print('Successfully loaded Graph.')
-        self.lbl2ent = {str(lbl): ent for ent, lbl in self.graph.subject_objects(RDFS.label)}
+        self._graph = None
+        self.snapshot = GraphSnapshot(self.graph_path)
+        if self.snapshot.is_valid():
+            self.snapshot.load()
+            print('Successfully loaded Graph from snapshot.')
+        elif self.ingest_workers > 1:
+            self.snapshot = build_snapshot(self.graph_path, self.ingest_workers)
+            print('Successfully loaded Graph with parallel ingest.')
+        else:
+            self._graph = Graph()
+            self._graph.parse(self.graph_path, format="nt")
+            print('Successfully loaded Graph. Writing snapshot...')
+            self.snapshot.save(self._graph)
+        self.triple_store = TripleStore(self.snapshot)
+
+    @property
+    def graph(self) -> Graph:
+        """
+        The rdflib graph, only rebuilt from the snapshot the first time SPARQL or a full triple scan needs it.
+        Lookups are answered by the triple store.
+        """
+        if self._graph is None:
+            print('Building rdflib graph from snapshot...')
+            self._graph = self.snapshot.to_graph()
+        return self._graph
+
+    @property
+    def lbl2ent(self):
+        # label -> entity, served from the shared term dictionary instead of a per-instance dict
+        return get_term_dictionaries().label2entity
 
     def execute_query(self, query: str, separator=" and ") -> str:
         """
@@ -64,6 +84,26 @@ class GraphDB:
 
         return answer.rstrip(separator)
 
+    def get_object_labels(self, entity: str, relation: str, separator=" and ") -> str:
+        """
+        Answers the fixed (entity, relation) -> objects question with a lookup in the integer-encoded
+        triple store instead of a SPARQL query. Objects are replaced by their label if they have one.
+
+        Args:
+            entity (str): The subject URI.
+            relation (str): The predicate URI.
+
+        Returns:
+            str: The object labels (or values) joined by the separator.
+        """
+        return separator.join(self.get_object_label_list(entity, relation))
+
+    def get_object_label_list(self, entity: str, relation: str) -> list[str]:
+        """
+        Like get_object_labels, but returns the object labels (or values) as a list.
+        """
+        return self.triple_store.object_labels(URIRef(entity), URIRef(relation))
+
     def extract_entities(self):
         # Extract entities and their labels from the graph
         entity2descriptions = {}
@@ -92,28 +132,7 @@ class GraphDB:
                 writer.writerow([entity, label])
 
     def extract_movies(self):
-        relevant_types = [
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q11424'),  # 'film'
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q17123180'),  # 'sequel film'
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q202866'),  # 'animated film'
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q622548'),  # 'parody film'
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q917641'),  # 'open-source film'
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q52207399'),  # 'film based on a novel'
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q31235'),  # 'remake'
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q24862'),  # 'short film'
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q104840802'),  # 'film remake'
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q112158242'),  # 'Tom and Jerry film'
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q24856'),  # 'film series'
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q2484376'),  # 'thriller film',
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q20650540'),  # 'anime film',
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q13593818'),  # 'film trilogy'
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q17517379'),  # 'animated short film'
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q678345'),  # 'prequel'
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q1257444'),  # 'film adaptation'
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q52162262'),  # 'film based on literature'
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q118189123'),  # 'animated film reboot'
-            rdflib.term.URIRef('http://www.wikidata.org/entity/Q506240'),  # 'television film'
-        ]
+        relevant_types = [URIRef(uri) for uri in RELEVANT_MOVIE_TYPES]
 
         relevant_entities = {}
         entity2label = {}
@@ -193,12 +212,8 @@ class GraphDB:
                     writer.writerow([keyword])
 
     def get_entity_type(self, uri: str):
-        query = f"""
-            SELECT ?type WHERE {{
-            <{uri}> <http://www.wikidata.org/prop/direct/P31> ?type .
-            }}
-        """
-        answer = self.execute_query(query)
+        types = self.triple_store.objects(URIRef(uri), self.relevant_suggestion_properties["instance_of"])
+        answer = " and ".join(str(entity_type) for entity_type in types)
 
         try:
             return answer.split("entity/")[1]
@@ -206,24 +221,37 @@ class GraphDB:
             return "Unknown"
 
     def get_movie_properties(self, uri: str):
-        def get_property(property_uri: str):
-            query = f"""
-                SELECT (COALESCE(?objLabel, STR(?obj)) AS ?result) WHERE {{
-                    <{uri}> <{property_uri}> ?obj .
-                    OPTIONAL {{
-                        ?obj rdfs:label ?objLabel .
-                    }}
-                }}
-            """
-            answer = self.execute_query(query, separator="\n")
-            if answer.strip() == "":
-                return []
-            return [line.strip() for line in answer.strip().split("\n")]
+        return self.get_movies_properties([uri])[uri]
 
-        result = {}
+    def get_movies_properties(self, uris: list[str]) -> dict[str, dict[str, list[str]]]:
+        """
+        Collects all relevant suggestion properties of several movies. Every movie costs a single range
+        scan over its SPO block in the triple store; objects are replaced by their labels.
 
+        Args:
+            uris (list[str]): The movie URIs.
+
+        Returns:
+            dict[str, dict[str, list[str]]]: The properties per movie URI, keyed like the input.
+        """
+        property_names = {}
         for property_name, property_uri in self.relevant_suggestion_properties.items():
-            result[property_name] = get_property(property_uri)
+            property_id = self.snapshot.term_id(property_uri)
+            if property_id is not None:
+                property_names[property_id] = property_name
+
+        result = {}
+        for uri in uris:
+            properties = {property_name: [] for property_name in self.relevant_suggestion_properties}
+            subject_id = self.snapshot.term_id(URIRef(uri))
+            if subject_id is not None:
+                predicate_ids, object_ids = self.triple_store.predicate_object_ids(subject_id)
+                for predicate_id, object_id in zip(predicate_ids.tolist(), object_ids.tolist()):
+                    property_name = property_names.get(predicate_id)
+                    if property_name is not None:
+                        properties[property_name].extend(
+                            value.strip() for value in self.triple_store.labels_or_values([object_id]))
+            result[uri] = properties
 
         return result
     
@@ -235,7 +263,7 @@ class GraphDB:
         entity = URIRef(uri)
         result = {}
 
-        for _, _, o in self.graph.triples((entity, imdb_property, None)):
+        for o in self.triple_store.objects(entity, imdb_property):
             imdb_id = str(o)
             if title_pattern.match(imdb_id):
                 result.setdefault("movies", []).append(imdb_id)
@@ -248,6 +276,8 @@ class GraphDB:
 
 
 if __name__ == "__main__":
-    graph_db = GraphDB()
-    graph_db.extract_entities()
-    graph_db.extract_movies()
\ No newline at end of file
+    # Stream graph.nt instead of loading it into rdflib (see GraphDB.extract_entities/extract_movies)
+    # Usage: python -m src.graph_db [workers]
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    GraphExtractor(os.path.join(data_dir, "graph.nt"), data_dir).extract(workers)
@@ -0,0 +1,372 @@
+import csv
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+from rdflib import Literal, URIRef
+
+from .graph_snapshot import BNODE_PREFIX, LITERAL_PREFIX, LITERAL_SEPARATOR, URI_PREFIX, GraphSnapshot, encode_term
+
+LABEL_URI = "http://www.w3.org/2000/01/rdf-schema#label"
+DESCRIPTION_URI = "http://schema.org/description"
+INSTANCE_OF_URI = "http://www.wikidata.org/prop/direct/P31"
+GENRE_URI = "http://www.wikidata.org/prop/direct/P136"
+
+RELEVANT_SUGGESTION_PROPERTIES = {
+    "instance_of": INSTANCE_OF_URI,
+    "publication_date": "http://www.wikidata.org/prop/direct/P577",
+    "director": "http://www.wikidata.org/prop/direct/P57",
+    "genre": GENRE_URI,
+    "award_received": "http://www.wikidata.org/prop/direct/P166",
+    "main_subject": "http://www.wikidata.org/prop/direct/P921",
+    "production_company": "http://www.wikidata.org/prop/direct/P272",
+    "after_a_work_by": "http://www.wikidata.org/prop/direct/P1877",
+    "narrative_location": "http://www.wikidata.org/prop/direct/P840",
+    "fsk_rating": "http://www.wikidata.org/prop/direct/P1981",
+    "composer": "http://www.wikidata.org/prop/direct/P86",
+    "producer": "http://www.wikidata.org/prop/direct/P162",
+    "director_of_photography": "http://www.wikidata.org/prop/direct/P344",
+    "screenwriter": "http://www.wikidata.org/prop/direct/P58",
+    "film_editor": "http://www.wikidata.org/prop/direct/P1040",
+    "nominated_for": "http://www.wikidata.org/prop/direct/P1411",
+    "sound_designer": "http://www.wikidata.org/prop/direct/P5028",
+    "movement": "http://www.wikidata.org/prop/direct/P135",
+}
+
+RELEVANT_MOVIE_TYPES = [
+    "http://www.wikidata.org/entity/Q11424",  # 'film'
+    "http://www.wikidata.org/entity/Q17123180",  # 'sequel film'
+    "http://www.wikidata.org/entity/Q202866",  # 'animated film'
+    "http://www.wikidata.org/entity/Q622548",  # 'parody film'
+    "http://www.wikidata.org/entity/Q917641",  # 'open-source film'
+    "http://www.wikidata.org/entity/Q52207399",  # 'film based on a novel'
+    "http://www.wikidata.org/entity/Q31235",  # 'remake'
+    "http://www.wikidata.org/entity/Q24862",  # 'short film'
+    "http://www.wikidata.org/entity/Q104840802",  # 'film remake'
+    "http://www.wikidata.org/entity/Q112158242",  # 'Tom and Jerry film'
+    "http://www.wikidata.org/entity/Q24856",  # 'film series'
+    "http://www.wikidata.org/entity/Q2484376",  # 'thriller film',
+    "http://www.wikidata.org/entity/Q20650540",  # 'anime film',
+    "http://www.wikidata.org/entity/Q13593818",  # 'film trilogy'
+    "http://www.wikidata.org/entity/Q17517379",  # 'animated short film'
+    "http://www.wikidata.org/entity/Q678345",  # 'prequel'
+    "http://www.wikidata.org/entity/Q1257444",  # 'film adaptation'
+    "http://www.wikidata.org/entity/Q52162262",  # 'film based on literature'
+    "http://www.wikidata.org/entity/Q118189123",  # 'animated film reboot'
+    "http://www.wikidata.org/entity/Q506240",  # 'television film'
+]
+
+# Column order of the property columns in movies_with_properties.csv
+MOVIE_CSV_PROPERTIES = [
+    "director",
+    "genre",
+    "award_received",
+    "main_subject",
+    "production_company",
+    "after_a_work_by",
+    "narrative_location",
+    "fsk_rating",
+    "composer",
+    "producer",
+    "director_of_photography",
+    "screenwriter",
+    "film_editor",
+    "nominated_for",
+    "sound_designer",
+    "movement",
+]
+
+TRIPLE_PATTERN = re.compile(
+    r'^\s*(<[^>]*>|_:\S+)\s+<([^>]*)>\s+(<[^>]*>|_:\S+|"(?:[^"\\]|\\.)*"(?:@[a-zA-Z0-9-]+|\^\^<[^>]*>)?)\s*\.\s*$'
+)
+LITERAL_PATTERN = re.compile(r'^"((?:[^"\\]|\\.)*)"(?:@([a-zA-Z0-9-]+)|\^\^<([^>]*)>)?$')
+ESCAPE_PATTERN = re.compile(r'\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))')
+ESCAPED_CHARACTERS = {"t": "\t", "b": "\b", "n": "\n", "r": "\r", "f": "\f", '"': '"', "'": "'", "\\": "\\"}
+
+
+def _unescape(value: str) -> str:
+    if "\\" not in value:
+        return value
+
+    def replace(match):
+        code_point = match.group(1) or match.group(2)
+        if code_point:
+            return chr(int(code_point, 16))
+        return ESCAPED_CHARACTERS.get(match.group(3), match.group(3))
+
+    return ESCAPE_PATTERN.sub(replace, value)
+
+
+def _encode_node(node: str) -> str:
+    if node.startswith("<"):
+        return URI_PREFIX + _unescape(node[1:-1])
+    if node.startswith("_:"):
+        return BNODE_PREFIX + node[2:]
+    lexical, lang, datatype = LITERAL_PATTERN.match(node).groups()
+    if datatype:
+        # rdflib normalizes typed lexical forms ("01"^^xsd:integer is "1"), encode them the way GraphSnapshot.save does
+        return encode_term(Literal(_unescape(lexical), datatype=URIRef(_unescape(datatype))))
+    return LITERAL_PREFIX + _unescape(lexical) + LITERAL_SEPARATOR + (lang or "") + LITERAL_SEPARATOR
+
+
+def parse_line(line: str) -> tuple[str, str, str] | None:
+    """
+    Parses one N-Triples line into terms in the GraphSnapshot encoding. Returns None for blank lines,
+    comments and lines that are not a triple.
+    """
+    match = TRIPLE_PATTERN.match(line)
+    if not match:
+        return None
+    subject, predicate, obj = match.groups()
+    return _encode_node(subject), URI_PREFIX + _unescape(predicate), _encode_node(obj)
+
+
+def term_value(encoded: str) -> str:
+    """
+    The str() value of an encoded term, i.e. the URI or the lexical form of a literal.
+    """
+    if encoded[0] == LITERAL_PREFIX:
+        return encoded[1:encoded.index(LITERAL_SEPARATOR)]
+    return encoded[1:]
+
+
+def read_lines(graph_path: str, start: int = 0, end: int | None = None):
+    """
+    Yields the lines of graph_path that start within the byte range [start, end).
+    """
+    with open(graph_path, "rb") as f:
+        if start > 0:
+            # The line running over the chunk start belongs to the previous chunk
+            f.seek(start - 1)
+            f.readline()
+        position = f.tell()
+        while end is None or position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            yield line.decode("utf-8")
+
+
+def split_file(graph_path: str, num_chunks: int) -> list[tuple[int, int]]:
+    """
+    Splits graph_path into byte ranges. Ranges do not need to be line aligned, read_lines assigns every
+    line to the range its first byte lies in.
+    """
+    size = os.path.getsize(graph_path)
+    chunk_size = max(1, -(-size // max(1, num_chunks)))
+    return [(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)]
+
+
+def encode_chunk(graph_path: str, start: int, end: int) -> tuple[list[str], np.ndarray]:
+    """
+    Parses one byte range into a chunk-local term list and an (n, 3) array of local term ids.
+    """
+    term2id = {}
+    ids = []
+    for line in read_lines(graph_path, start, end):
+        triple = parse_line(line)
+        if triple is None:
+            continue
+        for term in triple:
+            ids.append(term2id.setdefault(term, len(term2id)))
+    return list(term2id), np.array(ids, dtype=np.int64).reshape(-1, 3)
+
+
+def build_snapshot(graph_path: str, workers: int | None = None) -> GraphSnapshot:
+    """
+    Parses graph.nt in a process pool and writes the GraphSnapshot directly from the merged chunks,
+    without going through the rdflib parser.
+    """
+    workers = workers or os.cpu_count()
+    start = time.perf_counter()
+    chunks = split_file(graph_path, workers * 4)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parts = list(executor.map(encode_chunk, repeat(graph_path),
+                                  [chunk[0] for chunk in chunks], [chunk[1] for chunk in chunks]))
+
+    # Merge the chunk dictionaries into one sorted dictionary and remap the local ids
+    terms = sorted(set().union(*(local_terms for local_terms, _ in parts)))
+    term2id = {term: idx for idx, term in enumerate(terms)}
+    triples = np.concatenate([
+        np.array([term2id[term] for term in local_terms], dtype=np.int64)[local_triples]
+        for local_terms, local_triples in parts
+    ]) if parts else np.zeros((0, 3), dtype=np.int64)
+    triples = np.unique(triples, axis=0)
+
+    snapshot = GraphSnapshot(graph_path)
+    snapshot.set_arrays(terms, triples)
+    snapshot.write()
+    elapsed = time.perf_counter() - start
+    print(f"Parsed {len(triples)} triples with {workers} workers in {elapsed:.1f}s "
+          f"({len(triples) / max(elapsed, 1e-9):.0f} triples/sec)")
+    return snapshot
+
+
+class ExtractionResult:
+    """
+    What the movie CSV needs from the graph, collected while streaming over the triples. Only movie subjects
+    are kept in memory; labels and descriptions of all entities are streamed to CSV part files instead.
+    """
+
+    def __init__(self):
+        # subject -> relevant film type URIs
+        self.movie_types = {}
+        # movie subject -> {(property name, object value, object is a URI): None}, an ordered set of the edges
+        self.properties = {}
+        self.num_triples = 0
+
+    def merge(self, other: "ExtractionResult"):
+        for subject, types in other.movie_types.items():
+            merged_types = self.movie_types.setdefault(subject, [])
+            merged_types.extend(movie_type for movie_type in types if movie_type not in merged_types)
+        for subject, properties in other.properties.items():
+            self.properties.setdefault(subject, {}).update(properties)
+        self.num_triples += other.num_triples
+
+
+class GraphExtractor:
+    """
+    Builds entities.csv, descriptions.csv, movies_with_properties.csv and
+    movie_general_property_keywords.csv from two streaming passes over graph.nt, without loading the graph
+    into rdflib. The first pass finds the movies, the second one keeps only their property edges and writes
+    all labels and descriptions straight to disk, so memory grows with the number of movies rather than with
+    the graph.
+    """
+
+    def __init__(self, graph_path: str, output_dir: str):
+        self.graph_path = graph_path
+        self.output_dir = output_dir
+
+    def scan_movies(self, start: int = 0, end: int | None = None) -> ExtractionResult:
+        """
+        First pass: the subjects whose P31 is one of the RELEVANT_MOVIE_TYPES.
+        """
+        movie_types = {URI_PREFIX + uri for uri in RELEVANT_MOVIE_TYPES}
+        instance_of = URI_PREFIX + INSTANCE_OF_URI
+
+        result = ExtractionResult()
+        for line in read_lines(self.graph_path, start, end):
+            # Cheap substring check before the regex, almost all lines are skipped here
+            if INSTANCE_OF_URI not in line:
+                continue
+            triple = parse_line(line)
+            if triple is None:
+                continue
+            subject, predicate, obj = triple
+            if predicate == instance_of and obj in movie_types:
+                types = result.movie_types.setdefault(term_value(subject), [])
+                if term_value(obj) not in types:
+                    types.append(term_value(obj))
+        return result
+
+    def scan(self, part_path: str, movies: set[str], start: int = 0, end: int | None = None) -> ExtractionResult:
+        """
+        Second pass: writes the labels and descriptions of the byte range to part_path + ".entities.csv" and
+        ".descriptions.csv" and collects the relevant property edges of the movies.
+        """
+        property_names = {URI_PREFIX + uri: name for name, uri in RELEVANT_SUGGESTION_PROPERTIES.items()
+                          if name != "instance_of"}
+        label = URI_PREFIX + LABEL_URI
+        description = URI_PREFIX + DESCRIPTION_URI
+
+        result = ExtractionResult()
+        with open(part_path + ".entities.csv", mode="w", newline="", encoding="utf-8") as entities_file, \
+                open(part_path + ".descriptions.csv", mode="w", newline="", encoding="utf-8") as descriptions_file:
+            entities_writer = csv.writer(entities_file)
+            descriptions_writer = csv.writer(descriptions_file)
+            for line in read_lines(self.graph_path, start, end):
+                triple = parse_line(line)
+                if triple is None:
+                    continue
+                subject, predicate, obj = triple
+                result.num_triples += 1
+                if predicate == label:
+                    entities_writer.writerow([term_value(subject), term_value(obj)])
+                elif predicate == description:
+                    descriptions_writer.writerow([term_value(subject), term_value(obj)])
+                elif predicate in property_names and term_value(subject) in movies:
+                    edge = (property_names[predicate], term_value(obj), obj[0] == URI_PREFIX)
+                    result.properties.setdefault(term_value(subject), {})[edge] = None
+        return result
+
+    @staticmethod
+    def _run(workers: int, function, *arguments) -> ExtractionResult:
+        """
+        Runs function over the argument iterables, in a process pool with more than one worker, and merges the
+        partial results in file order so later labels still win like in a sequential scan.
+        """
+        result = ExtractionResult()
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for partial in executor.map(function, *arguments):
+                    result.merge(partial)
+        else:
+            for partial in map(function, *arguments):
+                result.merge(partial)
+        return result
+
+    def extract(self, workers: int = 1):
+        start = time.perf_counter()
+        chunks = split_file(self.graph_path, workers * 4) if workers > 1 else [(0, None)]
+        starts, ends = [chunk[0] for chunk in chunks], [chunk[1] for chunk in chunks]
+        parts_dir = os.path.join(self.output_dir, "extraction_parts")
+        os.makedirs(parts_dir, exist_ok=True)
+        part_paths = [os.path.join(parts_dir, f"part_{index:05d}") for index in range(len(chunks))]
+
+        movies = self._run(workers, self.scan_movies, starts, ends)
+        result = self._run(workers, self.scan, part_paths, repeat(set(movies.movie_types)), starts, ends)
+        result.movie_types = movies.movie_types
+        elapsed = time.perf_counter() - start
+        print(f"Scanned {result.num_triples} triples with {workers} worker(s) in {elapsed:.1f}s "
+              f"({result.num_triples / max(elapsed, 1e-9):.0f} triples/sec)")
+        self.write_csvs(result, part_paths)
+        shutil.rmtree(parts_dir)
+
+    def write_csvs(self, result: ExtractionResult, part_paths: list[str]):
+        for suffix in ("entities.csv", "descriptions.csv"):
+            with open(os.path.join(self.output_dir, suffix), "wb") as output_file:
+                for part_path in part_paths:
+                    with open(f"{part_path}.{suffix}", "rb") as part_file:
+                        shutil.copyfileobj(part_file, output_file)
+
+        # Only the labels of the movies and of their property values are needed in memory
+        needed = set(result.movie_types)
+        needed.update(value for properties in result.properties.values() for _, value, is_uri in properties if is_uri)
+        entity2label = {}
+        with open(os.path.join(self.output_dir, "entities.csv"), "r", newline="", encoding="utf-8") as csvfile:
+            for entity, label in csv.reader(csvfile):
+                if entity in needed:
+                    entity2label[entity] = label
+
+        genre_keywords = set()
+        with open(os.path.join(self.output_dir, "movies_with_properties.csv"), mode="w", newline="",
+                  encoding="utf-8") as csvfile:
+            writer = csv.writer(csvfile)
+            for entity in result.movie_types:
+                publication_date = None
+                values = {name: [] for name in MOVIE_CSV_PROPERTIES}
+                for name, value, is_uri in result.properties.get(entity, {}):
+                    if name == "publication_date":
+                        publication_date = value
+                        continue
+                    value = entity2label.get(value, value) if is_uri else value
+                    values[name].append(value)
+                    if name == "genre":
+                        genre_keywords.add(value)
+                row = [entity2label.get(entity, ""), entity, publication_date]
+                row.extend("; ".join(values[name]) for name in MOVIE_CSV_PROPERTIES)
+                writer.writerow(row)
+
+        with open(os.path.join(self.output_dir, "movie_general_property_keywords.csv"), mode="w", newline="",
+                  encoding="utf-8") as csvfile:
+            writer = csv.writer(csvfile)
+            for keyword in genre_keywords:
+                cleaned_keyword = keyword.replace("film", "").replace("movie", "").strip()
+                if len(cleaned_keyword) > 1:
+                    writer.writerow([cleaned_keyword])
+                    writer.writerow([keyword])
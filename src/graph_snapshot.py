@@ -0,0 +1,225 @@
+import json
+import os
+import time
+
+import numpy as np
+import xxhash
+from rdflib import BNode, Graph, Literal, RDFS, URIRef
+
+SNAPSHOT_VERSION = 2
+
+# Terms are stored as strings with a one character kind prefix so that they can be sorted
+# and compared without rdflib. Literal fields are separated by a NUL character.
+URI_PREFIX = "U"
+BNODE_PREFIX = "B"
+LITERAL_PREFIX = "L"
+LITERAL_SEPARATOR = "\x00"
+
+
+def encode_term(term) -> str:
+    if isinstance(term, URIRef):
+        return URI_PREFIX + str(term)
+    if isinstance(term, BNode):
+        return BNODE_PREFIX + str(term)
+    if isinstance(term, Literal):
+        return (LITERAL_PREFIX + str(term) + LITERAL_SEPARATOR + (term.language or "")
+                + LITERAL_SEPARATOR + (str(term.datatype) if term.datatype else ""))
+    raise ValueError(f"Unsupported term type: {type(term)}")
+
+
+def decode_term(encoded: str):
+    kind, value = encoded[0], encoded[1:]
+    if kind == URI_PREFIX:
+        return URIRef(value)
+    if kind == BNODE_PREFIX:
+        return BNode(value)
+    if kind == LITERAL_PREFIX:
+        lexical, lang, datatype = value.split(LITERAL_SEPARATOR)
+        return Literal(lexical, lang=lang or None, datatype=URIRef(datatype) if datatype else None)
+    raise ValueError(f"Unsupported encoded term: {encoded[:20]}")
+
+
+def hash_file(path: str, chunk_size: int = 1 << 24) -> str:
+    hasher = xxhash.xxh64()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class GraphSnapshot:
+    """
+    Dictionary-encoded binary snapshot of graph.nt.
+
+    Terms are stored sorted in a single UTF-8 blob with an offset array, triples as an (n, 3)
+    integer array of term ids sorted by subject, predicate, object. All arrays are plain .npy
+    files so they can be memory-mapped on load.
+    """
+
+    def __init__(self, graph_path: str, snapshot_dir: str | None = None):
+        self.graph_path = graph_path
+        self.snapshot_dir = snapshot_dir or os.path.join(os.path.dirname(graph_path), "graph_snapshot")
+        self.meta_path = os.path.join(self.snapshot_dir, "meta.json")
+        self.term_blob = None
+        self.term_offsets = None
+        self.triples = None
+
+    @property
+    def num_terms(self) -> int:
+        return len(self.term_offsets) - 1
+
+    def is_valid(self) -> bool:
+        """
+        Checks whether the snapshot on disk matches the current graph.nt. The mtime and size are
+        compared first; only if they differ is the file hashed (e.g. after a touch or a copy).
+        """
+        if not os.path.exists(self.meta_path):
+            return False
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != SNAPSHOT_VERSION:
+            return False
+
+        stat = os.stat(self.graph_path)
+        if meta["graph_mtime"] == stat.st_mtime and meta["graph_size"] == stat.st_size:
+            return True
+        if meta["graph_size"] != stat.st_size or meta["graph_hash"] != hash_file(self.graph_path):
+            return False
+
+        # Same content with a new mtime, remember it so the next boot skips hashing
+        meta["graph_mtime"] = stat.st_mtime
+        self._write_meta(meta)
+        return True
+
+    def load(self, mmap: bool = True):
+        """
+        Memory-maps the snapshot arrays. The rdflib graph is only built on demand with to_graph().
+        """
+        mmap_mode = "r" if mmap else None
+        self.term_blob = np.load(os.path.join(self.snapshot_dir, "term_blob.npy"), mmap_mode=mmap_mode)
+        self.term_offsets = np.load(os.path.join(self.snapshot_dir, "term_offsets.npy"), mmap_mode=mmap_mode)
+        self.triples = np.load(os.path.join(self.snapshot_dir, "triples.npy"), mmap_mode=mmap_mode)
+
+    def save(self, graph: Graph):
+        terms = sorted({encode_term(term) for triple in graph for term in triple})
+        term2id = {term: idx for idx, term in enumerate(terms)}
+        triples = np.fromiter(
+            (term2id[encode_term(term)] for triple in graph for term in triple),
+            dtype=np.int64, count=len(graph) * 3,
+        ).reshape(-1, 3)
+        self.set_arrays(terms, triples)
+        self.write()
+
+    def set_arrays(self, terms: list[str], triples: np.ndarray):
+        """
+        Sets the snapshot content from sorted encoded terms and an (n, 3) array of term ids.
+        """
+        encoded = [term.encode("utf-8") for term in terms]
+        self.term_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(term) for term in encoded], out=self.term_offsets[1:])
+        self.term_blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        id_dtype = np.int32 if len(terms) < np.iinfo(np.int32).max else np.int64
+        triples = triples.astype(id_dtype, copy=False)
+        order = np.lexsort((triples[:, 2], triples[:, 1], triples[:, 0]))
+        self.triples = triples[order]
+
+    def write(self):
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        # Indexes derived from an older snapshot (see TripleStore) are stale now
+        for file_name in os.listdir(self.snapshot_dir):
+            if file_name.startswith("index_"):
+                os.remove(os.path.join(self.snapshot_dir, file_name))
+        np.save(os.path.join(self.snapshot_dir, "term_blob.npy"), self.term_blob)
+        np.save(os.path.join(self.snapshot_dir, "term_offsets.npy"), self.term_offsets)
+        np.save(os.path.join(self.snapshot_dir, "triples.npy"), self.triples)
+
+        stat = os.stat(self.graph_path)
+        self._write_meta({
+            "version": SNAPSHOT_VERSION,
+            "graph_hash": hash_file(self.graph_path),
+            "graph_mtime": stat.st_mtime,
+            "graph_size": stat.st_size,
+            "num_terms": self.num_terms,
+            "num_triples": len(self.triples),
+        })
+
+    def encoded_term(self, term_id: int) -> str:
+        start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+        return bytes(self.term_blob[start:end]).decode("utf-8")
+
+    def term(self, term_id: int):
+        return decode_term(self.encoded_term(term_id))
+
+    def term_id(self, term) -> int | None:
+        # Terms are sorted by their encoded form, so a binary search over the blob finds the id
+        encoded = encode_term(term)
+        lo, hi = 0, self.num_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.encoded_term(mid) < encoded:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.num_terms and self.encoded_term(lo) == encoded:
+            return lo
+        return None
+
+    def decode_all_terms(self) -> list:
+        blob = bytes(self.term_blob)
+        offsets = self.term_offsets.tolist()
+        return [decode_term(blob[offsets[i]:offsets[i + 1]].decode("utf-8")) for i in range(self.num_terms)]
+
+    def to_graph(self) -> Graph:
+        terms = self.decode_all_terms()
+        graph = Graph()
+        graph.addN((terms[s], terms[p], terms[o], graph) for s, p, o in self.triples.tolist())
+        return graph
+
+    def label_map(self) -> dict:
+        """
+        Builds the label -> entity map directly from the encoded triples.
+        """
+        label_id = self.term_id(RDFS.label)
+        if label_id is None:
+            return {}
+        label_triples = self.triples[self.triples[:, 1] == label_id]
+        return {str(self.term(o)): self.term(s) for s, o in label_triples[:, [0, 2]].tolist()}
+
+    def _write_meta(self, meta: dict):
+        with open(self.meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+
+def benchmark(graph_path: str):
+    """
+    Compares a cold N-Triples parse with loading the binary snapshot.
+    """
+    snapshot = GraphSnapshot(graph_path)
+
+    start = time.perf_counter()
+    graph = Graph()
+    graph.parse(graph_path, format="nt")
+    {str(lbl): ent for ent, lbl in graph.subject_objects(RDFS.label)}
+    cold_parse = time.perf_counter() - start
+    print(f"Cold parse: {cold_parse:.2f}s ({len(graph)} triples)")
+
+    start = time.perf_counter()
+    snapshot.save(graph)
+    print(f"Snapshot write: {time.perf_counter() - start:.2f}s")
+    del graph
+
+    start = time.perf_counter()
+    snapshot = GraphSnapshot(graph_path)
+    assert snapshot.is_valid()
+    snapshot.load()
+    snapshot.label_map()
+    snapshot_load = time.perf_counter() - start
+    print(f"Snapshot load: {snapshot_load:.2f}s ({len(snapshot.triples)} triples)")
+    print(f"Speedup: {cold_parse / snapshot_load:.1f}x")
+
+
+if __name__ == "__main__":
+    src_dir = os.path.dirname(__file__)
+    base_dir = os.path.dirname(src_dir)
+    benchmark(os.path.join(base_dir, "data", "graph.nt"))
@@ -0,0 +1,58 @@
+import os
+import re
+import sqlite3
+import threading
+
+import xxhash
+
+from .lru_cache import LRUCache
+from .term_dictionary import normalize_label
+
+
+class LLMCache:
+    """
+    Persistent cache of LLM answers keyed on (prompt, normalized question, factual answer), so a repeated
+    question never reaches Ollama again, also across restarts. An in-process LRU sits in front of a SQLite file
+    with one file per model. The prompt template is hashed into every key: after it is edited, the old answers
+    are no longer hit.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, prompt: str, memory_size: int = 1000):
+        self.prompt_hash = xxhash.xxh64(prompt.encode("utf-8")).hexdigest()
+        self.memory = LRUCache(memory_size)
+        self.lock = threading.Lock()
+        self.disk_hits = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        file_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self.connection = sqlite3.connect(os.path.join(cache_dir, f"{file_name}.sqlite"), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, answer TEXT NOT NULL)")
+        self.connection.commit()
+
+    def key(self, question: str, factual_answer: str) -> str:
+        return xxhash.xxh64(f"{self.prompt_hash}\x00{normalize_label(question)}\x00{factual_answer}"
+                            .encode("utf-8")).hexdigest()
+
+    def get(self, question: str, factual_answer: str) -> str | None:
+        key = self.key(question, factual_answer)
+        answer = self.memory.get(key)
+        if answer is not None:
+            return answer
+        with self.lock:
+            row = self.connection.execute("SELECT answer FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.disk_hits += 1
+        self.memory.put(key, row[0])
+        return row[0]
+
+    def put(self, question: str, factual_answer: str, answer: str):
+        key = self.key(question, factual_answer)
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO answers (key, answer) VALUES (?, ?)", (key, answer))
+            self.connection.commit()
+        self.memory.put(key, answer)
+
+    def stats(self) -> dict:
+        return {"memory": self.memory.stats(), "disk_hits": self.disk_hits}
@@ -0,0 +1,207 @@
+import asyncio
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from contextlib import contextmanager, nullcontext
+
+import httpx
+import numpy as np
+import ollama
+from langchain_ollama import ChatOllama
+from lancedb.embeddings.ollama import OllamaEmbeddings
+
+CHAT_MODEL = "gemma3:4b"
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent query embedding requests for one Ollama embedding model into batched /api/embed calls.
+    A batch is sent once max_batch_size texts are waiting or the first one has waited max_wait seconds; while a
+    batch is in flight, new requests collect for the next one. Each batch takes a single gateway slot.
+    """
+
+    def __init__(self, gateway: "LLMGateway", embedding_function, max_batch_size: int, max_wait: float):
+        self.gateway = gateway
+        self.embedding_function = embedding_function
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.pending = []
+        self.condition = threading.Condition()
+        self.requests = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        with self.condition:
+            self.pending.append((text, future))
+            self.requests += 1
+            self.condition.notify()
+        return future
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                deadline = time.monotonic() + self.max_wait
+                while len(self.pending) < self.max_batch_size and time.monotonic() < deadline:
+                    self.condition.wait(deadline - time.monotonic())
+                batch = self.pending[:self.max_batch_size]
+                self.pending = self.pending[self.max_batch_size:]
+            # Requests cancelled while waiting (e.g. a cancelled coroutine) are left out of the call
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                with self.gateway.slot("embed_batch"):
+                    embeddings = self.embedding_function.generate_embeddings([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+
+
+class LLMGateway:
+    """
+    The single entry point for Ollama calls. Chat completions and Ollama embeddings share a bounded number of
+    concurrent calls, so several chat rooms queue here instead of piling up on the server. The chat model is one
+    ChatOllama with a pooled HTTP client, and both models are kept loaded with keep_alive. Every call records its
+    queue wait and duration.
+
+    Query embeddings for an Ollama model are batched: concurrent embed_query calls are sent as one request.
+
+    The instance is shared through get_llm_gateway, the limit holds within one process. Other processes (e.g.
+    an ingestion run) are only limited by the server itself, see OLLAMA_NUM_PARALLEL.
+    """
+
+    def __init__(self, chat_model: str = CHAT_MODEL, temperature: float = 0.4, max_concurrency: int | None = None,
+                 keep_alive: str | None = None, metrics_size: int = 1000):
+        self.chat_model = chat_model
+        self.max_concurrency = max_concurrency or int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4"))
+        self.keep_alive = keep_alive or os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+        self.host = os.getenv("OLLAMA_HOST")
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        self.chat_llm = ChatOllama(model=chat_model, temperature=temperature, keep_alive=self.keep_alive,
+                                   base_url=self.host, client_kwargs={"limits": limits})
+        self.slots = threading.BoundedSemaphore(self.max_concurrency)
+        self.metrics_lock = threading.Lock()
+        self.metrics = defaultdict(lambda: deque(maxlen=metrics_size))
+        self.embed_batch_size = int(os.getenv("OLLAMA_EMBED_BATCH_SIZE", "32"))
+        self.embed_batch_wait = float(os.getenv("OLLAMA_EMBED_BATCH_WAIT_MS", "5")) / 1000
+        self.embedding_batchers = {}
+        self.batchers_lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, kind: str):
+        """
+        Holds one of the concurrent call slots for the duration of the block and records the call under kind.
+        """
+        start = time.perf_counter()
+        self.slots.acquire()
+        acquired = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.slots.release()
+            self._record(kind, acquired - start, time.perf_counter() - acquired)
+
+    def embedding_slot(self, embedding_function, kind: str = "embed"):
+        """
+        slot() for an embedding call. Only Ollama embeddings compete with the chat model for the server, the
+        in-process backends are not limited.
+        """
+        if isinstance(embedding_function, OllamaEmbeddings):
+            return self.slot(kind)
+        return nullcontext()
+
+    def embed_query(self, embedding_function, text: str):
+        """
+        The query embedding of text. Ollama embeddings go through the model's EmbeddingBatcher, in-process
+        backends are computed directly.
+        """
+        if isinstance(embedding_function, OllamaEmbeddings):
+            return self._batcher(embedding_function).submit(text).result()
+        return embedding_function.compute_query_embeddings(text)[0]
+
+    async def async_embed_query(self, embedding_function, text: str):
+        """
+        embed_query() for coroutines. Cancelling the coroutine drops the text from its batch if it was not sent
+        yet, the gateway slot is held by the batcher and never by the caller.
+        """
+        if isinstance(embedding_function, OllamaEmbeddings):
+            return await asyncio.wrap_future(self._batcher(embedding_function).submit(text))
+        return (await asyncio.to_thread(embedding_function.compute_query_embeddings, text))[0]
+
+    def _batcher(self, embedding_function) -> EmbeddingBatcher:
+        with self.batchers_lock:
+            batcher = self.embedding_batchers.get(id(embedding_function))
+            if batcher is None:
+                batcher = EmbeddingBatcher(self, embedding_function, self.embed_batch_size, self.embed_batch_wait)
+                self.embedding_batchers[id(embedding_function)] = batcher
+            return batcher
+
+    def invoke(self, messages: list[dict]):
+        with self.slot("chat"):
+            return self.chat_llm.invoke(messages)
+
+    def stream(self, messages: list[dict]):
+        """
+        Yields the chunks of the completion. The slot is held until the stream is consumed.
+        """
+        with self.slot("chat_stream"):
+            yield from self.chat_llm.stream(messages)
+
+    def warm_up(self, embedding_function=None):
+        """
+        Loads the chat model (and the embedding model, if it is served by Ollama) so the first question does not
+        wait for it, and keeps it loaded for keep_alive.
+        """
+        start = time.perf_counter()
+        with self.slot("warm_up"):
+            # A chat request without messages only loads the model
+            ollama.Client(host=self.host).chat(model=self.chat_model, messages=[], keep_alive=self.keep_alive)
+        if isinstance(embedding_function, OllamaEmbeddings):
+            with self.slot("warm_up"):
+                embedding_function.compute_query_embeddings("warm up")
+        print(f"LLM gateway warmed up in {time.perf_counter() - start:.2f}s")
+
+    def _record(self, kind: str, wait_seconds: float, call_seconds: float):
+        with self.metrics_lock:
+            self.metrics[kind].append((wait_seconds, call_seconds))
+
+    def stats(self) -> dict:
+        """
+        Per call kind: number of recorded calls and p50/p95 of queue wait and call duration in milliseconds.
+        Batched query embeddings also report how many requests were sent in how many batches.
+        """
+        with self.metrics_lock:
+            metrics = {kind: np.array(calls) * 1000 for kind, calls in self.metrics.items() if calls}
+        stats = {kind: {"calls": len(calls),
+                        "wait_p50_ms": float(np.percentile(calls[:, 0], 50)),
+                        "wait_p95_ms": float(np.percentile(calls[:, 0], 95)),
+                        "call_p50_ms": float(np.percentile(calls[:, 1], 50)),
+                        "call_p95_ms": float(np.percentile(calls[:, 1], 95))}
+                 for kind, calls in metrics.items()}
+        if "embed_batch" in stats:
+            with self.batchers_lock:
+                stats["embed_batch"]["requests"] = sum(batcher.requests for batcher in self.embedding_batchers.values())
+        return stats
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """
+    Returns the process wide LLMGateway, creating it on first use.
+    """
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway()
+        return _gateway
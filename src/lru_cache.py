@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe bounded LRU cache with hit/miss counters.
+    """
+    _MISSING = object()
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            value = self.entries.get(key, self._MISSING)
+            if value is self._MISSING:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def __contains__(self, key) -> bool:
+        with self.lock:
+            return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
@@ -2,7 +2,6 @@ import datetime
 import os
 
 import numpy as np
-from rdflib import URIRef
 
 
 class SuggestionSearch:
@@ -111,10 +110,7 @@ class SuggestionSearch:
         entity_labels = list(extracted_entities_map.keys())
         try:
             # find movies similar to the given entities
-            entity_properties = {
-                uri: self.graph_db.get_movie_properties(URIRef(uri))
-                for uri in entity_uris
-            }
+            entity_properties = self.graph_db.get_movies_properties(entity_uris)
             # remove trivial properties
             for uri in entity_uris:
                 if 'instance_of' in entity_properties[uri] and 'film' in entity_properties[uri]['instance_of']:
@@ -0,0 +1,275 @@
+import csv
+import os
+import re
+import string
+import threading
+import unicodedata
+
+import numpy as np
+
+PUNCTUATION_PATTERN = re.compile(f"[{re.escape(string.punctuation)}‘’“”„«»–—…]")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_label(label: str) -> str:
+    """
+    Case and punctuation folded form of a label, used as key for exact label lookups.
+    """
+    label = unicodedata.normalize("NFKC", str(label)).casefold()
+    label = PUNCTUATION_PATTERN.sub(" ", label)
+    return WHITESPACE_PATTERN.sub(" ", label).strip()
+
+
+def is_relation(entity_uri: str) -> bool:
+    return entity_uri.split('/')[-1].startswith('P')
+
+
+class StringMap:
+    """
+    Read-only str -> str/int map backed by NumPy arrays instead of Python dicts.
+
+    Keys are stored sorted in one UTF-8 blob with an offset array and looked up with a binary search.
+    String values are stored the same way (in key order), int values as a plain array. The arrays can be
+    memory-mapped so every process shares the same pages. A small overlay dict takes runtime additions
+    (e.g. synonyms) without copying the base arrays, see view().
+    """
+
+    def __init__(self, key_blob, key_offsets, values, value_offsets=None, overlay: dict | None = None):
+        self.key_blob = key_blob
+        self.key_offsets = key_offsets
+        self.values = values
+        self.value_offsets = value_offsets
+        self.overlay = overlay if overlay is not None else {}
+
+    @classmethod
+    def build(cls, mapping: dict) -> "StringMap":
+        keys = sorted(mapping)
+        key_blob, key_offsets = _to_blob(keys)
+        if keys and isinstance(mapping[keys[0]], int):
+            return cls(key_blob, key_offsets, np.array([mapping[key] for key in keys], dtype=np.int64))
+        value_blob, value_offsets = _to_blob([str(mapping[key]) for key in keys])
+        return cls(key_blob, key_offsets, value_blob, value_offsets)
+
+    @classmethod
+    def load(cls, directory: str, name: str, mmap: bool = True) -> "StringMap":
+        mmap_mode = "r" if mmap else None
+        arrays = [np.load(os.path.join(directory, f"{name}_{part}.npy"), mmap_mode=mmap_mode)
+                  for part in ("key_blob", "key_offsets", "values")]
+        value_offsets_path = os.path.join(directory, f"{name}_value_offsets.npy")
+        value_offsets = np.load(value_offsets_path, mmap_mode=mmap_mode) if os.path.exists(value_offsets_path) else None
+        return cls(*arrays, value_offsets)
+
+    def save(self, directory: str, name: str):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, f"{name}_key_blob.npy"), self.key_blob)
+        np.save(os.path.join(directory, f"{name}_key_offsets.npy"), self.key_offsets)
+        np.save(os.path.join(directory, f"{name}_values.npy"), self.values)
+        value_offsets_path = os.path.join(directory, f"{name}_value_offsets.npy")
+        if self.value_offsets is not None:
+            np.save(value_offsets_path, self.value_offsets)
+        elif os.path.exists(value_offsets_path):
+            os.remove(value_offsets_path)
+
+    def view(self) -> "StringMap":
+        """
+        A map sharing the base arrays with its own, empty overlay.
+        """
+        return StringMap(self.key_blob, self.key_offsets, self.values, self.value_offsets)
+
+    def _key(self, index: int) -> bytes:
+        return bytes(self.key_blob[self.key_offsets[index]:self.key_offsets[index + 1]])
+
+    def _value(self, index: int):
+        if self.value_offsets is None:
+            return int(self.values[index])
+        return bytes(self.values[self.value_offsets[index]:self.value_offsets[index + 1]]).decode("utf-8")
+
+    def _index(self, key: str) -> int | None:
+        encoded = str(key).encode("utf-8")
+        lo, hi = 0, len(self.key_offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < encoded:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.key_offsets) - 1 and self._key(lo) == encoded:
+            return lo
+        return None
+
+    def get(self, key, default=None):
+        key = str(key)
+        if key in self.overlay:
+            return self.overlay[key]
+        index = self._index(key)
+        return default if index is None else self._value(index)
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.overlay[str(key)] = value
+
+    def __contains__(self, key) -> bool:
+        key = str(key)
+        return key in self.overlay or self._index(key) is not None
+
+    def __len__(self) -> int:
+        return len(self.key_offsets) - 1 + sum(1 for key in self.overlay if self._index(key) is None)
+
+    def keys(self):
+        for key, _ in self.items():
+            yield key
+
+    def items(self):
+        blob = bytes(self.key_blob)
+        offsets = self.key_offsets.tolist()
+        for index in range(len(offsets) - 1):
+            key = blob[offsets[index]:offsets[index + 1]].decode("utf-8")
+            if key not in self.overlay:
+                yield key, self._value(index)
+        yield from self.overlay.items()
+
+
+_MISSING = object()
+
+
+class StringList:
+    """
+    Read-only list of strings stored as one UTF-8 blob with an offset array, indexed by position.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, strings: list[str]) -> "StringList":
+        return cls(*_to_blob(strings))
+
+    @classmethod
+    def load(cls, directory: str, name: str, mmap: bool = True) -> "StringList":
+        mmap_mode = "r" if mmap else None
+        return cls(np.load(os.path.join(directory, f"{name}_blob.npy"), mmap_mode=mmap_mode),
+                   np.load(os.path.join(directory, f"{name}_offsets.npy"), mmap_mode=mmap_mode))
+
+    def save(self, directory: str, name: str):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, f"{name}_blob.npy"), self.blob)
+        np.save(os.path.join(directory, f"{name}_offsets.npy"), self.offsets)
+
+    def __getitem__(self, index: int) -> str:
+        return bytes(self.blob[self.offsets[index]:self.offsets[index + 1]]).decode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+def _to_blob(strings: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    encoded = [string.encode("utf-8") for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(string) for string in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+class TermDictionaries:
+    """
+    The entity/label/description/id maps shared by GraphDB, VectorStore and EmbeddingSearch. They are
+    built once from the CSV/.del files in data/ and cached as .npy files in data/term_dictionary.
+    """
+
+    def __init__(self, data_dir: str, mmap: bool = True):
+        self.data_dir = data_dir
+        self.cache_dir = os.path.join(data_dir, "term_dictionary")
+        self.mmap = mmap
+        entities_csv = os.path.join(data_dir, "entities.csv")
+        self.entity2label = self._load_or_build("entity2label", entities_csv,
+                                                lambda: dict(_read_csv_pairs(entities_csv)))
+        # normalized label -> tab separated entity URIs, split into entities and relations
+        self.normalized_entity_labels = self._load_or_build(
+            "normalized_entity_labels", entities_csv,
+            lambda: label_buckets((label, entity) for entity, label in _read_csv_pairs(entities_csv)
+                                  if not is_relation(entity)))
+        self.normalized_relation_labels = self._load_or_build(
+            "normalized_relation_labels", entities_csv,
+            lambda: label_buckets((label, entity) for entity, label in _read_csv_pairs(entities_csv)
+                                  if is_relation(entity)))
+        self.label2entity = self._load_or_build("label2entity", entities_csv,
+                                                lambda: {label: entity for entity, label in _read_csv_pairs(entities_csv)})
+        descriptions_csv = os.path.join(data_dir, "descriptions.csv")
+        self.entity2description = self._load_or_build("entity2description", descriptions_csv,
+                                                      lambda: dict(_read_csv_pairs(descriptions_csv)))
+        entity_ids = os.path.join(data_dir, "entity_ids.del")
+        self.entity2id = self._load_or_build("entity2id", entity_ids, lambda: _read_ids(entity_ids))
+        self.id2entity = self._load_or_build_list("id2entity", entity_ids, lambda: _reverse_ids(_read_ids(entity_ids)))
+
+    def _load_or_build(self, name: str, source_path: str, build) -> StringMap:
+        key_blob_path = os.path.join(self.cache_dir, f"{name}_key_blob.npy")
+        if os.path.exists(key_blob_path) and os.path.getmtime(key_blob_path) >= os.path.getmtime(source_path):
+            return StringMap.load(self.cache_dir, name, self.mmap)
+
+        print(f"Building term dictionary {name}...")
+        StringMap.build(build()).save(self.cache_dir, name)
+        return StringMap.load(self.cache_dir, name, self.mmap)
+
+    def _load_or_build_list(self, name: str, source_path: str, build) -> StringList:
+        blob_path = os.path.join(self.cache_dir, f"{name}_blob.npy")
+        if os.path.exists(blob_path) and os.path.getmtime(blob_path) >= os.path.getmtime(source_path):
+            return StringList.load(self.cache_dir, name, self.mmap)
+
+        print(f"Building term list {name}...")
+        StringList.build(build()).save(self.cache_dir, name)
+        return StringList.load(self.cache_dir, name, self.mmap)
+
+
+def label_buckets(pairs) -> dict[str, str]:
+    """
+    Groups (label, entity) pairs by normalized label. Values are the tab separated entity URIs.
+    """
+    buckets = {}
+    for label, entity in pairs:
+        key = normalize_label(label)
+        if key:
+            buckets.setdefault(key, []).append(entity)
+    return {key: "\t".join(dict.fromkeys(entities)) for key, entities in buckets.items()}
+
+
+def _read_csv_pairs(path: str):
+    with open(path, "r", encoding="utf-8") as csv_file:
+        for key, value in csv.reader(csv_file):
+            yield key, value
+
+
+def _read_ids(path: str) -> dict[str, int]:
+    ids = {}
+    with open(path) as f:
+        for line in f:
+            idx, name = line.strip().split()
+            ids[name] = int(idx)
+    return ids
+
+
+def _reverse_ids(ids: dict[str, int]) -> list[str]:
+    names = [""] * (max(ids.values(), default=-1) + 1)
+    for name, idx in ids.items():
+        names[idx] = name
+    return names
+
+
+_shared_dictionaries = None
+_shared_lock = threading.Lock()
+
+
+def get_term_dictionaries() -> TermDictionaries:
+    """
+    Returns the process-wide TermDictionaries, loading them on first use.
+    """
+    global _shared_dictionaries
+    with _shared_lock:
+        if _shared_dictionaries is None:
+            base_dir = os.path.dirname(os.path.dirname(__file__))
+            _shared_dictionaries = TermDictionaries(os.path.join(base_dir, "data"))
+        return _shared_dictionaries
@@ -1,26 +1,35 @@
+import os
 import re
 import string
 
-from langchain_ollama import ChatOllama
-
+from src.answer_stream import ChunkPoster, stream_answer
+from src.answer_templates import AnswerTemplates
+from src.llm_cache import LLMCache
+from src.llm_gateway import get_llm_gateway
+from src.vector_store.async_vector_store import get_async_vector_store
 from src.vector_store.vector_store import VectorStore
 
+# Part of the LLM cache key, so cached answers are not reused once the prompt changes
+ANSWER_PROMPT = """
+Given the question: "{question}" and the factual answer: "{factual_answer}", generate a concise and informative answer.
+DO NOT ADD ANY ADDITIONAL INFORMATION.
+ONLY TRANSFORM IT TO A NATURAL LANGUAGE ANSWER.
+Use a helpful, engaging and conversational tone and ensure your answer sounds natural.
+Do NOT ask any follow up questions.
+Ensure the EXACT factual answer is included in your response and do not wrap it into stars or quotes."""
+
 
 class Transformer:
     def __init__(self, vector_store: VectorStore):
-        self.transform_llm = ChatOllama(model="gemma3:4b", temperature=0.4)
+        # Shared with every other Transformer, so all chat rooms queue on the same Ollama gateway
+        self.llm_gateway = get_llm_gateway()
         self.vector_store = vector_store
+        self.async_vector_store = get_async_vector_store(vector_store)
+        self.answer_templates = AnswerTemplates(vector_store.entity2label)
+        self.llm_cache = LLMCache(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'llm_cache'),
+                                  self.llm_gateway.chat_model, ANSWER_PROMPT)
 
 
-    def get_query_for_entity_relation(self, entity: str, relation: str) -> str:
-        return f"""SELECT (COALESCE(?objLabel, STR(?obj)) AS ?result) WHERE {{
-                    <{entity}> <{relation}> ?obj .
-                    OPTIONAL {{
-                        ?obj rdfs:label ?objLabel .
-                    }}
-                }}
-                """
-
     def extract_movie_relation_entities(self, text_query: str) ->tuple[str, str]:
         relation_search_query, entity_search_query = self.extract_named_entities(text_query)
         if entity_search_query is None:
@@ -31,10 +40,12 @@ class Transformer:
         entity_search_query = self.clean_text_query(entity_search_query)
         relation_search_query = self.clean_text_query(relation_search_query)
 
-        node_result = self.vector_store.find_movie_with_label(entity_search_query)
+        # The movie and the relation lookups are independent, so they run concurrently
+        node_result, pred_result = self.async_vector_store.gather(
+            self.async_vector_store.find_movie_with_label(entity_search_query),
+            self.async_vector_store.find_similar_relation(relation_search_query, 3))
         print(entity_search_query, node_result[0]['metadata'])
         node = node_result[0]['metadata']['entity']
-        pred_result = self.vector_store.find_similar_relation(relation_search_query, 3)
         print(relation_search_query, pred_result[0]['metadata'])
         pred = pred_result[0]['metadata']['entity']
 
@@ -42,7 +53,6 @@ class Transformer:
     
     def extract_suggestion_entities(self, text_query: str, general_prop_in_query) -> dict[str, str]:
         entities_search_query = self.remove_quotes(text_query)
-        entities = []
         match = re.search(r"(?:like|such as|including|for example)\s+(.*?)(?:\bcan you\b|\bgive\b|\brecommend\b|[?.!]|$)", entities_search_query, re.IGNORECASE)
 
         movies = match.group(1) if match else self.clean_text_query(text_query)
@@ -51,8 +61,7 @@ class Transformer:
             parts = movies.split(" and ")
         if parts[-1].strip().startswith("and "):
             parts[-1] = parts[-1].strip()[4:]
-        for part in parts:
-            entities.append(self.vector_store.find_movie_with_label(part))
+        entities = self.async_vector_store.run(self.async_vector_store.find_movies_with_labels(parts))
 
         entities = {entity[0]['metadata']['label']: entity[0]['metadata']['entity'] for entity in entities if entity and (entity[0]['_distance'] < 0.15 or not general_prop_in_query)}
         print("extracted entities for suggestion: " + str(entities))
@@ -249,16 +258,43 @@ class Transformer:
         return None, None
 
 
-    def transform_answer(self, question:str, factual_answer: str) -> str:
+    def transform_answer(self, question: str, factual_answer: str, entity: str | None = None,
+                         relation: str | None = None, values: list[str] | None = None,
+                         poster: ChunkPoster | None = None) -> str:
+        """
+        Turns the factual answer into a natural language answer. Simple answers (a single value of a resolved
+        entity and relation) are filled into a template; everything else goes to the LLM, whose answers are
+        cached on disk by (prompt, normalized question, factual answer).
+
+        Args:
+            question: the user's question
+            factual_answer: the answer found in the graph or the embeddings
+            entity: the resolved entity URI, if any
+            relation: the resolved relation URI, if any
+            values: the individual answer values factual_answer was joined from
+            poster: if given, the answer is posted through it while the LLM streams it
+        """
         print(f"Transforming answer: {factual_answer}")
-        prompt = f"""
-        Given the question: "{question}" and the factual answer: "{factual_answer}", generate a concise and informative answer.
-        DO NOT ADD ANY ADDITIONAL INFORMATION. 
-        ONLY TRANSFORM IT TO A NATURAL LANGUAGE ANSWER. 
-        Use a helpful, engaging and conversational tone and ensure your answer sounds natural. 
-        Do NOT ask any follow up questions.
-        Ensure the EXACT factual answer is included in your response and do not wrap it into stars or quotes."""
-        response = self.transform_llm.invoke([{"role": "user", "content": prompt}]).content
+        if entity is not None and relation is not None and values is not None:
+            templated_answer = self.answer_templates.render(entity, relation, values)
+            if templated_answer is not None:
+                if poster is not None:
+                    poster.post_all(templated_answer)
+                return templated_answer
+
+        cached_answer = self.llm_cache.get(question, factual_answer)
+        if cached_answer is not None:
+            if poster is not None:
+                poster.post_all(cached_answer)
+            return cached_answer
+
+        prompt = ANSWER_PROMPT.format(question=question, factual_answer=factual_answer)
+        messages = [{"role": "user", "content": prompt}]
+        if poster is not None:
+            response = stream_answer(self.llm_gateway, messages, poster)
+        else:
+            response = self.llm_gateway.invoke(messages).content
+        self.llm_cache.put(question, factual_answer, response)
         return response
 
 if __name__ == "__main__":
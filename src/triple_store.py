@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+from rdflib import RDFS
+
+from .graph_snapshot import GraphSnapshot
+
+
+class TripleStore:
+    """
+    Integer-encoded triple store on top of a GraphSnapshot.
+
+    Keeps three sorted permutations of the triples (SPO, POS, OSP). Each permutation stores the
+    first two term ids combined into one int64 key and the third term id as value, so every
+    two-bound lookup is a binary search on the key array.
+    """
+    PERMUTATIONS = {
+        # name: column order (key columns first, value column last)
+        "spo": (0, 1, 2),
+        "pos": (1, 2, 0),
+        "osp": (2, 0, 1),
+    }
+
+    def __init__(self, snapshot: GraphSnapshot, mmap: bool = True):
+        self.snapshot = snapshot
+        self.num_terms = snapshot.num_terms
+        self.indexes = {}
+        self._load_or_build_indexes(mmap)
+        self.label_id = snapshot.term_id(RDFS.label)
+
+    def _load_or_build_indexes(self, mmap: bool):
+        mmap_mode = "r" if mmap else None
+        for name, columns in self.PERMUTATIONS.items():
+            keys_path = os.path.join(self.snapshot.snapshot_dir, f"index_{name}_keys.npy")
+            values_path = os.path.join(self.snapshot.snapshot_dir, f"index_{name}_values.npy")
+            if os.path.exists(keys_path) and os.path.exists(values_path):
+                self.indexes[name] = (np.load(keys_path, mmap_mode=mmap_mode),
+                                      np.load(values_path, mmap_mode=mmap_mode))
+                continue
+
+            first, second, value = (self.snapshot.triples[:, column] for column in columns)
+            order = np.lexsort((value, second, first))
+            keys = first[order].astype(np.int64) * self.num_terms + second[order]
+            values = np.ascontiguousarray(value[order])
+            np.save(keys_path, keys)
+            np.save(values_path, values)
+            self.indexes[name] = (keys, values)
+
+    def _lookup(self, index: str, first: int, second: int) -> np.ndarray:
+        keys, values = self.indexes[index]
+        key = first * self.num_terms + second
+        lo = np.searchsorted(keys, key, side="left")
+        hi = np.searchsorted(keys, key, side="right")
+        return values[lo:hi]
+
+    def _scan(self, index: str, first: int) -> tuple[np.ndarray, np.ndarray]:
+        # All entries whose first key column equals `first`, returned as (second, value) arrays
+        keys, values = self.indexes[index]
+        lo = np.searchsorted(keys, first * self.num_terms, side="left")
+        hi = np.searchsorted(keys, (first + 1) * self.num_terms, side="left")
+        return keys[lo:hi] - first * self.num_terms, values[lo:hi]
+
+    def object_ids(self, subject_id: int, predicate_id: int) -> np.ndarray:
+        return self._lookup("spo", subject_id, predicate_id)
+
+    def subject_ids(self, predicate_id: int, object_id: int) -> np.ndarray:
+        return self._lookup("pos", predicate_id, object_id)
+
+    def predicate_ids(self, object_id: int, subject_id: int) -> np.ndarray:
+        return self._lookup("osp", object_id, subject_id)
+
+    def predicate_object_ids(self, subject_id: int) -> tuple[np.ndarray, np.ndarray]:
+        return self._scan("spo", subject_id)
+
+    def object_subject_ids(self, predicate_id: int) -> tuple[np.ndarray, np.ndarray]:
+        return self._scan("pos", predicate_id)
+
+    def objects(self, subject, predicate) -> list:
+        subject_id, predicate_id = self.snapshot.term_id(subject), self.snapshot.term_id(predicate)
+        if subject_id is None or predicate_id is None:
+            return []
+        return [self.snapshot.term(o) for o in self.object_ids(subject_id, predicate_id).tolist()]
+
+    def labels_or_values(self, object_ids) -> list[str]:
+        """
+        Equivalent of COALESCE(?objLabel, STR(?obj)) with an OPTIONAL rdfs:label on every object.
+        """
+        result = []
+        for object_id in object_ids:
+            label_ids = self.object_ids(object_id, self.label_id) if self.label_id is not None else []
+            if len(label_ids) > 0:
+                result.extend(str(self.snapshot.term(label_id)) for label_id in label_ids.tolist())
+            else:
+                result.append(str(self.snapshot.term(object_id)))
+        return result
+
+    def object_labels(self, subject, predicate) -> list[str]:
+        subject_id, predicate_id = self.snapshot.term_id(subject), self.snapshot.term_id(predicate)
+        if subject_id is None or predicate_id is None:
+            return []
+        return self.labels_or_values(self.object_ids(subject_id, predicate_id).tolist())
@@ -0,0 +1,134 @@
+import os
+from collections import Counter
+
+import numpy as np
+from rdflib import URIRef
+
+from .graph_extractor import INSTANCE_OF_URI
+
+
+class TypePartitions:
+    """
+    Partitions of the entity embedding matrix by P31 type, plus the types each relation's objects usually
+    have (its range). A KGE search for a relation then only scores the entities of the range partitions.
+
+    Type members and relation ranges are stored CSR-style: an offsets array per group and one flat array of
+    entity embedding ids (or type indices).
+    """
+
+    def __init__(self, type_names: np.ndarray, type_offsets: np.ndarray, type_members: np.ndarray,
+                 relation_names: np.ndarray, range_offsets: np.ndarray, range_types: np.ndarray):
+        self.type_names = type_names
+        self.type_offsets = type_offsets
+        self.type_members = type_members
+        self.relation_names = relation_names
+        self.range_offsets = range_offsets
+        self.range_types = range_types
+        self.relation_index = {str(name): index for index, name in enumerate(relation_names)}
+        self.partition_cache = {}
+
+    @classmethod
+    def build(cls, graph_db, entity2id, relation_uris, coverage: float = 0.95, max_types: int = 5) -> "TypePartitions":
+        snapshot = graph_db.snapshot
+        instance_of_id = snapshot.term_id(URIRef(INSTANCE_OF_URI))
+        # (subject, type) pairs, sorted by subject because the snapshot triples are SPO sorted
+        typed = snapshot.triples[snapshot.triples[:, 1] == instance_of_id][:, [0, 2]].astype(np.int64)
+        typed_subjects, typed_types = typed[:, 0], typed[:, 1]
+
+        unique_subjects = np.unique(typed_subjects)
+        subject_embedding_ids = np.array([entity2id.get(str(snapshot.term(subject)), -1)
+                                          for subject in unique_subjects.tolist()], dtype=np.int64)
+        embedding_ids = subject_embedding_ids[np.searchsorted(unique_subjects, typed_subjects)]
+        has_embedding = embedding_ids >= 0
+
+        member_types, member_ids = typed_types[has_embedding], embedding_ids[has_embedding]
+        order = np.lexsort((member_ids, member_types))
+        member_types, member_ids = member_types[order], member_ids[order]
+        type_ids, type_counts = np.unique(member_types, return_counts=True)
+        type_offsets = np.zeros(len(type_ids) + 1, dtype=np.int64)
+        np.cumsum(type_counts, out=type_offsets[1:])
+        type_position = {type_id: index for index, type_id in enumerate(type_ids.tolist())}
+
+        relation_names, range_offsets, range_types = [], [0], []
+        for relation_uri in relation_uris:
+            relation_id = snapshot.term_id(URIRef(relation_uri))
+            if relation_id is None:
+                continue
+            objects, _ = graph_db.triple_store.object_subject_ids(relation_id)
+            counts = Counter()
+            for obj, occurrences in zip(*np.unique(objects, return_counts=True)):
+                lo = np.searchsorted(typed_subjects, obj, side="left")
+                hi = np.searchsorted(typed_subjects, obj, side="right")
+                for type_id in typed_types[lo:hi].tolist():
+                    if type_id in type_position:
+                        counts[type_id] += int(occurrences)
+            if not counts:
+                # Literal-valued relations (dates, ids) have no entity range
+                continue
+
+            total, covered, chosen = sum(counts.values()), 0, []
+            for type_id, count in counts.most_common(max_types):
+                chosen.append(type_position[type_id])
+                covered += count
+                if covered / total >= coverage:
+                    break
+            relation_names.append(relation_uri)
+            range_types.extend(chosen)
+            range_offsets.append(len(range_types))
+
+        type_names = np.array([str(snapshot.term(type_id)) for type_id in type_ids.tolist()])
+        return cls(type_names, type_offsets, member_ids, np.array(relation_names),
+                   np.array(range_offsets, dtype=np.int64), np.array(range_types, dtype=np.int64))
+
+    @classmethod
+    def load(cls, path: str) -> "TypePartitions":
+        with np.load(path) as data:
+            return cls(data["type_names"], data["type_offsets"], data["type_members"],
+                       data["relation_names"], data["range_offsets"], data["range_types"])
+
+    def save(self, path: str):
+        np.savez(path, type_names=self.type_names, type_offsets=self.type_offsets, type_members=self.type_members,
+                 relation_names=self.relation_names, range_offsets=self.range_offsets, range_types=self.range_types)
+
+    def type_partition(self, type_index: int) -> np.ndarray:
+        return self.type_members[self.type_offsets[type_index]:self.type_offsets[type_index + 1]]
+
+    def relation_range(self, relation_uri: str) -> list[str]:
+        index = self.relation_index.get(str(relation_uri))
+        if index is None:
+            return []
+        return [str(self.type_names[type_index])
+                for type_index in self.range_types[self.range_offsets[index]:self.range_offsets[index + 1]]]
+
+    def partition_for_relation(self, relation_uri: str) -> np.ndarray | None:
+        """
+        Sorted entity embedding ids of all entities whose type is in the relation's range, None if the
+        relation has no known range.
+        """
+        relation_uri = str(relation_uri)
+        if relation_uri in self.partition_cache:
+            return self.partition_cache[relation_uri]
+        index = self.relation_index.get(relation_uri)
+        if index is None:
+            partition = None
+        else:
+            type_indices = self.range_types[self.range_offsets[index]:self.range_offsets[index + 1]]
+            partition = np.unique(np.concatenate([self.type_partition(type_index) for type_index in type_indices]))
+        self.partition_cache[relation_uri] = partition
+        return partition
+
+
+def load_or_build_type_partitions(embeddings_path: str, graph_db, entity2id, relation_uris) -> TypePartitions:
+    """
+    Loads the partitions persisted next to the embedding file (entity_embeds.types.npz), rebuilding them when
+    the embeddings or graph.nt are newer.
+    """
+    path = os.path.splitext(embeddings_path)[0] + ".types.npz"
+    if (os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(embeddings_path)
+            and os.path.getmtime(path) >= os.path.getmtime(graph_db.graph_path)):
+        return TypePartitions.load(path)
+
+    print("Building entity type partitions...")
+    partitions = TypePartitions.build(graph_db, entity2id, relation_uris)
+    partitions.save(path)
+    return partitions
@@ -0,0 +1,148 @@
+import asyncio
+import threading
+import time
+from typing import List
+
+import lancedb
+import numpy as np
+
+from ..llm_gateway import get_llm_gateway
+from .relation_resolver import MOVIE_RELATION_FILTER
+from .table_schema import func
+from .vector_store import VectorStore
+
+
+class AsyncVectorStore:
+    """
+    asyncio variant of the VectorStore lookups, so independent lookups (a movie and a relation, or all movies of
+    a recommendation) run concurrently instead of one after the other.
+
+    It shares the label indexes, embedding cache, reranker and search settings of the wrapped VectorStore, but
+    queries LanceDB through its async connection and embeds through the LLM gateway, which batches concurrent
+    Ollama query embeddings (in-process backends run in a worker thread). Everything runs on one event loop in a
+    background thread; synchronous code submits work with run() and gather().
+    """
+
+    def __init__(self, vector_store: VectorStore):
+        self.vector_store = vector_store
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.loop_thread.start()
+        self.tables = {}
+        self.vector_db = self.run(lancedb.connect_async(vector_store.vector_db_path))
+
+    def run(self, coroutine):
+        """
+        Runs a coroutine on the store's event loop and waits for its result.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def gather(self, *coroutines) -> list:
+        """
+        Runs the coroutines concurrently and returns their results in order.
+        """
+        return self.run(self._gather(coroutines))
+
+    @staticmethod
+    async def _gather(coroutines):
+        return await asyncio.gather(*coroutines)
+
+    async def find_similar_relation(self, estimated_label: str, k=1) -> List[dict]:
+        print("relation estimate: " + estimated_label)
+        resolver = self.vector_store.relation_resolver
+        matches = resolver.lookup(estimated_label, k)
+        if matches:
+            return matches
+        query_vector = await self._embed_query(estimated_label)
+        matches = resolver.nearest(estimated_label, query_vector, k)
+        if matches:
+            return matches
+        table = await self._table(self.vector_store.movie_relations_table_name)
+        query = self.vector_store.index_manager.tune(self.vector_store.movie_relations_table_name,
+                                                     table.vector_search(query_vector))
+        matches = await self._rerank(query.where(MOVIE_RELATION_FILTER).limit(k), estimated_label)
+        resolver.remember(estimated_label, k, matches)
+        return matches
+
+    async def find_similar_entity(self, estimated_label: str, k=1) -> List[dict]:
+        print("entity estimate: " + estimated_label)
+        label_index = self.vector_store.entity_label_index
+        exact_matches = label_index.lookup(estimated_label) or label_index.fuzzy_lookup(estimated_label)
+        if exact_matches:
+            return exact_matches
+        query = await self._vector_search(self.vector_store.entities_table_name, estimated_label)
+        return await self._rerank(query.limit(k), estimated_label)
+
+    async def find_movie_with_label(self, label: str) -> List[dict]:
+        label_index = self.vector_store.movie_label_index
+        exact_matches = label_index.lookup(label) or label_index.fuzzy_lookup(label)
+        if exact_matches:
+            return exact_matches
+        query = await self._vector_search(self.vector_store.movies_labels_table_name, label)
+        return await query.limit(1).to_list()
+
+    async def find_movies_with_labels(self, labels: list[str]) -> list[List[dict]]:
+        return await asyncio.gather(*(self.find_movie_with_label(label) for label in labels))
+
+    async def _table(self, table_name: str):
+        if table_name not in self.tables:
+            self.tables[table_name] = await self.vector_db.open_table(table_name)
+        return self.tables[table_name]
+
+    async def _vector_search(self, table_name: str, text: str):
+        table, vector = await asyncio.gather(self._table(table_name), self._embed_query(text))
+        return self.vector_store.index_manager.tune(table_name, table.vector_search(vector))
+
+    async def _embed_query(self, text: str) -> np.ndarray:
+        embedding_cache = self.vector_store.embedding_cache
+        vector = embedding_cache.get(text)
+        if vector is None:
+            embedding = await get_llm_gateway().async_embed_query(func, text)
+            vector = np.asarray(embedding, dtype=np.float32)
+            embedding_cache.put(text, vector)
+        return vector
+
+    async def _rerank(self, query, query_string: str) -> List[dict]:
+        # The cross encoder is CPU bound, so it runs in a worker thread instead of blocking the loop
+        results = await query.to_arrow()
+        reranked = await asyncio.to_thread(self.vector_store.reranker.rerank_vector, query_string, results)
+        return reranked.to_pylist()
+
+
+_async_stores = {}
+_async_stores_lock = threading.Lock()
+
+
+def get_async_vector_store(vector_store: VectorStore) -> AsyncVectorStore:
+    """
+    Returns the AsyncVectorStore of vector_store, creating it (and its event loop thread) on first use.
+    """
+    with _async_stores_lock:
+        if id(vector_store) not in _async_stores:
+            _async_stores[id(vector_store)] = AsyncVectorStore(vector_store)
+        return _async_stores[id(vector_store)]
+
+
+def benchmark(labels: list[str]):
+    """
+    Compares resolving the labels one after the other with the sync store against one concurrent gather.
+    """
+    vector_store = VectorStore()
+    async_store = get_async_vector_store(vector_store)
+    # Suffixed variants, so neither the label indexes nor the embedding cache answer the lookups
+    queries = [f"{label} {run}" for run in range(2) for label in labels]
+    sequential_queries, concurrent_queries = queries[:len(labels)], queries[len(labels):]
+
+    start = time.perf_counter()
+    for label in sequential_queries:
+        vector_store.find_movie_with_label(label)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    async_store.run(async_store.find_movies_with_labels(concurrent_queries))
+    concurrent = time.perf_counter() - start
+    print(f"{len(labels)} lookups: sequential {sequential * 1000:.0f}ms, concurrent {concurrent * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    benchmark(["The Godfather", "Pulp Fiction", "The Lion King", "Forrest Gump"])
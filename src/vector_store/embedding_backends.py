@@ -0,0 +1,137 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from typing import List, Union
+
+import numpy as np
+import xxhash
+from lancedb.embeddings import TextEmbeddingFunction, get_registry, register
+from lancedb.util import attempt_import_or_raise
+
+# Selected with the EMBEDDING_BACKEND environment variable, like OLLAMA_HOST for the Ollama server
+EMBEDDING_BACKENDS = ("ollama", "sentence-transformers", "hashing")
+DEFAULT_MODELS = {
+    "ollama": "snowflake-arctic-embed:335m",
+    # The same model as the Ollama default, run in-process
+    "sentence-transformers": "Snowflake/snowflake-arctic-embed-l",
+    "hashing": "hashing",
+}
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+@register("hashing")
+class HashingEmbeddings(TextEmbeddingFunction):
+    """
+    Deterministic, dependency free embeddings for tests and benchmarks: words and character trigrams are
+    hashed into `dimensions` signed buckets and the vector is L2 normalized. Texts sharing words or spelling
+    end up close, which is enough to exercise ingestion and search without a model.
+    """
+
+    name: str = "hashing"
+    dimensions: int = 384
+
+    def ndims(self) -> int:
+        return self.dimensions
+
+    def generate_embeddings(self, texts: Union[List[str], np.ndarray]) -> List[np.ndarray]:
+        return [self._embed(str(text)) for text in texts]
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            padded = f"#{token}#"
+            for feature in [token] + [padded[i:i + 3] for i in range(len(padded) - 2)]:
+                digest = xxhash.xxh64_intdigest(feature.encode("utf-8"))
+                vector[digest % self.dimensions] += 1.0 if digest >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+
+@register("pooled-sentence-transformers")
+class PooledSentenceTransformerEmbeddings(TextEmbeddingFunction):
+    """
+    In-process sentence-transformers embeddings. Texts are encoded in batches of batch_size; with workers > 1
+    the batches are spread over a thread pool (pool="thread", torch releases the GIL) or over
+    sentence-transformers' multi-process pool (pool="process", one model copy per process).
+    """
+
+    name: str = DEFAULT_MODELS["sentence-transformers"]
+    device: str = "cpu"
+    batch_size: int = 64
+    workers: int = 1
+    pool: str = "thread"
+    normalize: bool = True
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._ndims = None
+
+    def ndims(self) -> int:
+        if self._ndims is None:
+            self._ndims = self.model.get_sentence_embedding_dimension()
+        return self._ndims
+
+    @cached_property
+    def model(self):
+        sentence_transformers = attempt_import_or_raise("sentence_transformers", "sentence-transformers")
+        return sentence_transformers.SentenceTransformer(self.name, device=self.device)
+
+    @cached_property
+    def executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=self.workers)
+
+    @cached_property
+    def process_pool(self):
+        return self.model.start_multi_process_pool([self.device] * self.workers)
+
+    def generate_embeddings(self, texts: Union[List[str], np.ndarray]) -> List[np.ndarray]:
+        texts = list(texts)
+        if self.workers > 1 and self.pool == "process":
+            return list(self.model.encode(texts, pool=self.process_pool, batch_size=self.batch_size,
+                                          normalize_embeddings=self.normalize))
+        if self.workers > 1 and len(texts) > self.batch_size:
+            chunks = [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+            return [vector for vectors in self.executor.map(self._encode, chunks) for vector in vectors]
+        return list(self._encode(texts))
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True,
+                                 normalize_embeddings=self.normalize)
+
+
+def create_embedding_function(backend: str | None = None, model: str | None = None):
+    """
+    Creates the LanceDB embedding function of the configured backend.
+
+    Args:
+        backend: one of EMBEDDING_BACKENDS, defaults to $EMBEDDING_BACKEND or "ollama"
+        model: model name, defaults to $EMBEDDING_MODEL or the backend's default model
+    """
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "ollama")
+    model = model or os.getenv("EMBEDDING_MODEL") or DEFAULT_MODELS.get(backend)
+    if backend == "ollama":
+        # Kept loaded as long as the chat model, see LLMGateway
+        keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+        # Ollama host is only set if defined in environment variables -> needed for containerization
+        if os.getenv("OLLAMA_HOST"):
+            return get_registry().get("ollama").create(name=model, host=os.getenv("OLLAMA_HOST"),
+                                                       keep_alive=keep_alive)
+        return get_registry().get("ollama").create(name=model, keep_alive=keep_alive)
+    if backend == "sentence-transformers":
+        return get_registry().get("pooled-sentence-transformers").create(
+            name=model, device=os.getenv("EMBEDDING_DEVICE", "cpu"),
+            workers=int(os.getenv("EMBEDDING_WORKERS", "1")), pool=os.getenv("EMBEDDING_POOL", "thread"))
+    if backend == "hashing":
+        dimensions = int(os.getenv("EMBEDDING_DIMENSIONS", "384"))
+        return get_registry().get("hashing").create(name=f"hashing-{dimensions}", dimensions=dimensions)
+    raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {', '.join(EMBEDDING_BACKENDS)}")
+
+
+def vector_db_name(backend: str | None = None) -> str:
+    """
+    Directory name of the LanceDB database below data/. Backends have different vector sizes, so every
+    backend but Ollama gets its own database.
+    """
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "ollama")
+    return "lancedb" if backend == "ollama" else f"lancedb_{backend}"
@@ -0,0 +1,78 @@
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
+
+from ..llm_gateway import get_llm_gateway
+from ..lru_cache import LRUCache
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache for query embeddings: an in-process LRU in front of a SQLite file on disk, both keyed
+    by the content hash of the text. One file per embedding model, so switching models never mixes vectors.
+    """
+
+    def __init__(self, embedding_function, cache_dir: str, key_function, memory_size: int = 10_000):
+        self.embedding_function = embedding_function
+        self.key_function = key_function
+        self.memory = LRUCache(memory_size)
+        self.lock = threading.Lock()
+        self.disk_hits = 0
+        self.misses = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        model_name = re.sub(r"[^A-Za-z0-9_.-]", "_", getattr(embedding_function, "name", "embeddings"))
+        self.connection = sqlite3.connect(os.path.join(cache_dir, f"{model_name}.sqlite"), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self.connection.commit()
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = self.get(text)
+        if vector is None:
+            embedding = get_llm_gateway().embed_query(self.embedding_function, text)
+            vector = np.asarray(embedding, dtype=np.float32)
+            self.put(text, vector)
+        return vector
+
+    def get(self, text: str) -> np.ndarray | None:
+        """
+        The cached vector of text from memory or disk, None on a miss. Callers that compute the vector
+        themselves (e.g. with an async client) store it with put().
+        """
+        key = self.key_function(text)
+        vector = self.memory.get(key)
+        if vector is not None:
+            return vector
+
+        with self.lock:
+            row = self.connection.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        vector = np.frombuffer(row[0], dtype=np.float32)
+        self.memory.put(key, vector)
+        return vector
+
+    def put(self, text: str, vector: np.ndarray):
+        key = self.key_function(text)
+        vector = np.asarray(vector, dtype=np.float32)
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                                    (key, vector.tobytes()))
+            self.connection.commit()
+        self.memory.put(key, vector)
+
+    def stats(self) -> dict:
+        requests = self.memory.hits + self.memory.misses
+        return {
+            "requests": requests,
+            "memory_hits": self.memory.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory.hits + self.disk_hits) / requests if requests else 0.0,
+        }
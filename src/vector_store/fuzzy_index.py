@@ -0,0 +1,228 @@
+import csv
+import math
+import os
+import random
+import time
+
+import numpy as np
+import xxhash
+
+from ..term_dictionary import StringList, normalize_label
+
+FUZZY_MIN_CONFIDENCE = 0.8
+
+
+def trigram_keys(label: str) -> np.ndarray:
+    """
+    Hashed character trigrams of a normalized label, padded like pg_trgm so word starts count twice.
+    """
+    padded = f"  {label} "
+    return np.unique(np.array([xxhash.xxh64_intdigest(padded[i:i + 3].encode("utf-8")) >> 1
+                               for i in range(len(padded) - 2)], dtype=np.int64))
+
+
+def max_edits(min_confidence: float, length: int) -> int:
+    """
+    Largest edit distance with 1 - distance / length >= min_confidence. The epsilon keeps products such as
+    (1 - 0.8) * 5 = 0.99999... from being truncated to one edit less.
+    """
+    return math.floor((1 - min_confidence) * length + 1e-9)
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Levenshtein distance of a and b with adjacent transpositions counting as one edit. Gives up early and
+    returns max_distance + 1 once the distance is certain to exceed max_distance.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_previous, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]
+                    and previous_previous[j - 2] + 1 < current[j]):
+                current[j] = previous_previous[j - 2] + 1
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class FuzzyLabelIndex:
+    """
+    Approximate lookup of normalized labels: a trigram inverted index proposes the labels sharing the most
+    trigrams with the query (by Dice coefficient), and an edit distance check picks the best of them.
+
+    The postings are stored CSR-style like the triple indexes: sorted trigram keys, an offset array and one
+    flat array of label ids, so the index can be saved and memory-mapped.
+    """
+
+    def __init__(self, labels: StringList, trigram_keys_: np.ndarray, posting_offsets: np.ndarray,
+                 postings: np.ndarray, trigram_counts: np.ndarray):
+        self.labels = labels
+        self.trigram_keys = trigram_keys_
+        self.posting_offsets = posting_offsets
+        self.postings = postings
+        self.trigram_counts = trigram_counts
+
+    @classmethod
+    def build(cls, labels) -> "FuzzyLabelIndex":
+        labels = sorted({label for label in labels if label})
+        keys, label_ids, trigram_counts = [], [], np.zeros(len(labels), dtype=np.int32)
+        for label_id, label in enumerate(labels):
+            label_keys = trigram_keys(label)
+            keys.append(label_keys)
+            label_ids.append(np.full(len(label_keys), label_id, dtype=np.int32))
+            trigram_counts[label_id] = len(label_keys)
+
+        keys = np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64)
+        label_ids = np.concatenate(label_ids) if label_ids else np.zeros(0, dtype=np.int32)
+        order = np.lexsort((label_ids, keys))
+        keys, label_ids = keys[order], label_ids[order]
+        unique_keys, starts = np.unique(keys, return_index=True)
+        posting_offsets = np.append(starts, len(keys)).astype(np.int64)
+        return cls(StringList.build(labels), unique_keys, posting_offsets, label_ids, trigram_counts)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "FuzzyLabelIndex":
+        mmap_mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in ("label_blob", "label_offsets", "trigram_keys", "posting_offsets", "postings",
+                               "trigram_counts")}
+        return cls(StringList(arrays["label_blob"], arrays["label_offsets"]), arrays["trigram_keys"],
+                   arrays["posting_offsets"], arrays["postings"], arrays["trigram_counts"])
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        for name, array in (("label_blob", self.labels.blob), ("label_offsets", self.labels.offsets),
+                            ("trigram_keys", self.trigram_keys), ("posting_offsets", self.posting_offsets),
+                            ("postings", self.postings), ("trigram_counts", self.trigram_counts)):
+            np.save(os.path.join(path, f"{name}.npy"), array)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def match(self, label: str, min_confidence: float = FUZZY_MIN_CONFIDENCE,
+              candidates: int = 20) -> tuple[str, float] | None:
+        """
+        Finds the indexed label closest to label.
+
+        Args:
+            label: the label as typed, it is normalized first
+            min_confidence: lowest accepted 1 - edit distance / length of the longer label
+            candidates: number of trigram candidates verified with the edit distance
+
+        Returns:
+            (normalized label, confidence) of the best match, None if no label is close enough
+        """
+        query = normalize_label(label)
+        if not query or len(self) == 0:
+            return None
+        query_keys = trigram_keys(query)
+        positions = np.searchsorted(self.trigram_keys, query_keys)
+        found = positions < len(self.trigram_keys)
+        found[found] = self.trigram_keys[positions[found]] == query_keys[found]
+        positions = positions[found]
+        if len(positions) == 0:
+            return None
+
+        hits = np.concatenate([self.postings[self.posting_offsets[position]:self.posting_offsets[position + 1]]
+                               for position in positions.tolist()])
+        label_ids, shared = np.unique(hits, return_counts=True)
+        dice = 2 * shared / (len(query_keys) + self.trigram_counts[label_ids])
+        if len(label_ids) > candidates:
+            best = np.argpartition(-dice, candidates)[:candidates]
+            label_ids, dice = label_ids[best], dice[best]
+
+        best_match, best_confidence = None, 0.0
+        for label_id in label_ids[np.argsort(-dice, kind="stable")].tolist():
+            candidate = self.labels[label_id]
+            length = max(len(query), len(candidate))
+            max_distance = max_edits(max(min_confidence, best_confidence), length)
+            distance = edit_distance(query, candidate, max_distance)
+            if distance > max_distance:
+                continue
+            confidence = 1 - distance / length
+            if confidence > best_confidence:
+                best_match, best_confidence = candidate, confidence
+                if distance == 0:
+                    break
+        # Accepted matches are already within max_edits of min_confidence
+        if best_match is None:
+            return None
+        return best_match, best_confidence
+
+
+def load_or_build_fuzzy_index(path: str, source_path: str, labels) -> FuzzyLabelIndex:
+    """
+    Loads the index saved in path, rebuilding it from labels (an iterable of normalized labels, only consumed
+    when building) when source_path is newer.
+    """
+    marker = os.path.join(path, "trigram_counts.npy")
+    if os.path.exists(marker) and os.path.getmtime(marker) >= os.path.getmtime(source_path):
+        return FuzzyLabelIndex.load(path)
+
+    print(f"Building fuzzy label index {os.path.basename(path)}...")
+    index = FuzzyLabelIndex.build(labels)
+    index.save(path)
+    return FuzzyLabelIndex.load(path)
+
+
+def misspell(title: str, rng: random.Random, edits: int = 1) -> str:
+    """
+    Applies random typos (deletion, insertion, substitution, transposition) to a title.
+    """
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    for _ in range(edits):
+        if len(title) < 2:
+            break
+        position = rng.randrange(len(title) - 1)
+        operation = rng.choice(("delete", "insert", "substitute", "transpose"))
+        if operation == "delete":
+            title = title[:position] + title[position + 1:]
+        elif operation == "insert":
+            title = title[:position] + rng.choice(letters) + title[position:]
+        elif operation == "substitute":
+            title = title[:position] + rng.choice(letters) + title[position + 1:]
+        else:
+            title = title[:position] + title[position + 1] + title[position] + title[position + 2:]
+    return title
+
+
+def benchmark(titles: list[str], samples: int = 1000, edits: int = 1, seed: int = 0):
+    """
+    Resolves misspelled titles and reports how many resolve to the right title, how many are rejected (and
+    would fall through to vector search) and the lookup latency.
+    """
+    start = time.perf_counter()
+    index = FuzzyLabelIndex.build(normalize_label(title) for title in titles)
+    print(f"Indexed {len(index)} labels in {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(seed)
+    sample = rng.sample(titles, min(samples, len(titles)))
+    correct = wrong = rejected = 0
+    latency = []
+    for title in sample:
+        query = misspell(title, rng, edits)
+        start = time.perf_counter()
+        match = index.match(query)
+        latency.append((time.perf_counter() - start) * 1000)
+        if match is None:
+            rejected += 1
+        elif match[0] == normalize_label(title):
+            correct += 1
+        else:
+            wrong += 1
+    print(f"{len(sample)} titles with {edits} typo(s): {correct} correct, {wrong} wrong, {rejected} rejected; "
+          f"p50 {np.percentile(latency, 50):.3f}ms  p95 {np.percentile(latency, 95):.3f}ms")
+
+
+if __name__ == "__main__":
+    movies_path = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'movies_with_properties.csv')
+    with open(movies_path, 'r', encoding="utf-8") as csv_file:
+        movie_titles = [row[0] for row in csv.reader(csv_file)]
+    for typos in (1, 2):
+        benchmark(movie_titles, edits=typos)
@@ -0,0 +1,138 @@
+import os
+import sys
+import time
+
+import lancedb
+import numpy as np
+
+from .embedding_backends import vector_db_name
+
+# Per table ANN settings. Small tables stay unindexed: a flat scan over a few thousand rows is exact and fast.
+# nprobes/refine_factor (IVF_PQ) and ef (HNSW) are applied to every vector query on the table.
+INDEX_SETTINGS = {
+    "entities": {"index_type": "IVF_PQ", "nprobes": 20, "refine_factor": 10},
+    "relations": {"index_type": "IVF_HNSW_SQ", "nprobes": 10, "ef": 64},
+    "movie_labels": {"index_type": "IVF_HNSW_SQ", "nprobes": 10, "ef": 64},
+    "movie_properties": {"index_type": "IVF_HNSW_SQ", "nprobes": 10, "ef": 64},
+}
+# Scalar indexes on the flat copies of metadata.label and metadata.type (see TableSchema)
+SCALAR_INDEXES = {"label": "BTREE", "type": "BITMAP"}
+MIN_ROWS_FOR_VECTOR_INDEX = 10_000
+
+
+class IndexManager:
+    """
+    Builds and refreshes the vector and scalar indexes of the LanceDB tables and applies the per table search
+    settings to vector queries.
+    """
+
+    def __init__(self, vector_db, settings: dict | None = None, min_rows: int = MIN_ROWS_FOR_VECTOR_INDEX):
+        self.vector_db = vector_db
+        self.settings = settings or INDEX_SETTINGS
+        self.min_rows = min_rows
+
+    def build(self, table_name: str, rebuild: bool = False):
+        """
+        Creates the missing indexes of a table. Existing indexes are brought up to date with optimize(), which
+        adds rows written since the index was built; rebuild retrains them from scratch.
+        """
+        table = self.vector_db.open_table(table_name)
+        indexed_columns = {column for index in table.list_indices() for column in index.columns}
+        rows = table.count_rows()
+        settings = self.settings.get(table_name, {})
+
+        if "vector" in indexed_columns and not rebuild:
+            table.optimize()
+            print(f"{table_name}: refreshed indexes ({rows} rows)")
+        elif rows >= self.min_rows and settings:
+            start = time.perf_counter()
+            table.create_index(metric="l2", index_type=settings["index_type"], replace=True,
+                               num_sub_vectors=self._num_sub_vectors(table, settings))
+            print(f"{table_name}: built {settings['index_type']} index on {rows} rows "
+                  f"in {time.perf_counter() - start:.1f}s")
+        else:
+            print(f"{table_name}: {rows} rows, no vector index (flat search)")
+
+        for column, index_type in SCALAR_INDEXES.items():
+            if rebuild or column not in indexed_columns:
+                table.create_scalar_index(column, index_type=index_type, replace=True)
+
+    def build_all(self, rebuild: bool = False):
+        for table_name in self.settings:
+            self.build(table_name, rebuild)
+
+    def tune(self, table_name: str, query):
+        """
+        Applies the table's nprobes/refine_factor/ef to a vector query. They are ignored for flat searches.
+        """
+        settings = self.settings.get(table_name, {})
+        if "nprobes" in settings:
+            query = query.nprobes(settings["nprobes"])
+        if "refine_factor" in settings:
+            query = query.refine_factor(settings["refine_factor"])
+        if "ef" in settings:
+            query = query.ef(settings["ef"])
+        return query
+
+    def _num_sub_vectors(self, table, settings: dict) -> int | None:
+        if settings["index_type"] != "IVF_PQ":
+            return None
+        # 16 dimensions per PQ sub vector; the dimension must be divisible by it
+        dimension = table.schema.field("vector").type.list_size
+        return settings.get("num_sub_vectors") or max(1, dimension // 16)
+
+    def benchmark(self, table_name: str, queries: int = 100, k: int = 10, nprobes_values=(5, 10, 20, 50),
+                  sample_size: int = 5000, noise: float = 0.01):
+        """
+        Measures recall@k and latency of the indexed search against an exact flat search. The query vectors are
+        stored vectors with a little noise, so they are realistic but never exact duplicates.
+        """
+        table = self.vector_db.open_table(table_name)
+        sample = table.search().select(["vector"]).limit(sample_size).to_arrow()["vector"]
+        if len(sample) == 0:
+            print(f"{table_name}: empty table")
+            return
+        rng = np.random.default_rng(0)
+        vectors = np.asarray(sample.to_pylist(), dtype=np.float32)
+        query_vectors = vectors[rng.choice(len(vectors), size=min(queries, len(vectors)), replace=False)]
+        query_vectors += rng.normal(scale=noise * np.abs(query_vectors).mean(), size=query_vectors.shape)
+
+        exact, exact_latency = self._run_queries(table, query_vectors, k, lambda query: query.bypass_vector_index())
+        print(f"{table_name}: {table.count_rows()} rows, {len(query_vectors)} queries, k={k}")
+        print(f"  flat        recall 1.000  p50 {np.percentile(exact_latency, 50):7.2f}ms  "
+              f"p95 {np.percentile(exact_latency, 95):7.2f}ms")
+
+        if not any("vector" in index.columns for index in table.list_indices()):
+            print("  no vector index")
+            return
+        settings = dict(self.settings.get(table_name, {}))
+        for nprobes in nprobes_values:
+            settings["nprobes"] = nprobes
+            tuned = IndexManager(self.vector_db, {table_name: settings})
+            results, latency = self._run_queries(table, query_vectors, k,
+                                                 lambda query: tuned.tune(table_name, query))
+            recall = np.mean([len(set(found) & set(expected)) / max(1, len(expected))
+                              for found, expected in zip(results, exact)])
+            print(f"  nprobes {nprobes:<3} recall {recall:.3f}  p50 {np.percentile(latency, 50):7.2f}ms  "
+                  f"p95 {np.percentile(latency, 95):7.2f}ms")
+
+    def _run_queries(self, table, query_vectors: np.ndarray, k: int, configure) -> tuple[list, np.ndarray]:
+        results, latency = [], []
+        for query_vector in query_vectors:
+            start = time.perf_counter()
+            rows = configure(table.search(query_vector).select(["id", "_distance"]).limit(k)).to_arrow()
+            latency.append((time.perf_counter() - start) * 1000)
+            results.append(rows["id"].to_pylist())
+        return results, np.array(latency)
+
+
+if __name__ == "__main__":
+    # python -m src.vector_store.index_manager build [--rebuild] | benchmark [table ...]
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    table_names = [arg for arg in sys.argv[2:] if not arg.startswith("--")] or list(INDEX_SETTINGS)
+    manager = IndexManager(lancedb.connect(os.path.join(os.path.dirname(__file__), '..', '..', 'data', vector_db_name())))
+    for name in table_names:
+        if command == "benchmark":
+            manager.benchmark(name)
+        else:
+            manager.build(name, rebuild="--rebuild" in sys.argv)
@@ -0,0 +1,194 @@
+import logging
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator
+
+import lancedb
+import numpy as np
+import pyarrow as pa
+from tqdm import tqdm
+
+from ..llm_gateway import get_llm_gateway
+from .table_schema import TableSchema, func
+from .table_sync import TableSync, document_id
+
+ARROW_SCHEMA = TableSchema.to_arrow_schema()
+METADATA_TYPE = ARROW_SCHEMA.field("metadata").type
+VECTOR_TYPE = ARROW_SCHEMA.field("vector").type
+
+# A row is (text, entity, label, description, type), the metadata fields in TableSchema order
+Row = tuple[str, str, str, str, str]
+
+
+def _to_record_batch(columns: list[list[str]]) -> pa.RecordBatch:
+    ids, texts, entities, labels, descriptions, types = (pa.array(column, type=pa.string()) for column in columns)
+    metadata = pa.StructArray.from_arrays([entities, labels, descriptions, types], fields=list(METADATA_TYPE))
+    return pa.RecordBatch.from_arrays([ids, texts, metadata], names=["id", "text", "metadata"])
+
+
+def embed_record_batch(batch: pa.RecordBatch) -> pa.RecordBatch:
+    """
+    Adds the vector column with one batched embedding call and orders the columns like TableSchema.
+    """
+    # Whole batches are embedded in one call, counted against the gateway's concurrency limit like any Ollama call
+    with get_llm_gateway().embedding_slot(func, "embed_source"):
+        embeddings = func.compute_source_embeddings_with_retry(batch.column("text"))
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    vectors = pa.FixedSizeListArray.from_arrays(pa.array(embeddings.reshape(-1)), VECTOR_TYPE.list_size)
+    metadata = batch.column("metadata")
+    columns = {"vector": vectors, "id": batch.column("id"), "text": batch.column("text"), "metadata": metadata,
+               "label": metadata.field("label"), "type": metadata.field("type")}
+    return pa.RecordBatch.from_arrays([columns[name] for name in ARROW_SCHEMA.names], schema=ARROW_SCHEMA)
+
+
+class IngestionPipeline:
+    """
+    Streams rows into a LanceDB table: rows -> RecordBatches -> batched embedding calls -> table.add.
+
+    Embedding calls run on embed_workers threads (they wait on the embedding server), while the batches are
+    written in order from the calling thread. At most 2 * embed_workers batches are in flight, so a slow
+    embedder holds back the row generator instead of filling memory. A batch is cut when it is full or its
+    first row has waited max_latency seconds, and the batch size adapts to how long embedding a batch takes,
+    aiming for target_embed_seconds.
+
+    A batch that fails to embed or write is retried with backoff, then split in halves so one bad row cannot
+    sink the rest of its batch. The ids of rows that still fail are kept in failed_ids.
+    """
+
+    def __init__(self, table, sync: TableSync | None = None, batch_size: int = 256, embed_workers: int = 4,
+                 max_latency: float = 2.0, target_embed_seconds: float = 5.0, min_batch_size: int = 16,
+                 max_batch_size: int | None = None, max_retries: int = 3, retry_backoff: float = 1.0):
+        self.logger = logging.getLogger(__name__)
+        self.table = table
+        self.sync = sync
+        self.batch_size = batch_size
+        self.min_batch_size = min(min_batch_size, batch_size)
+        self.max_batch_size = max_batch_size or batch_size * 4
+        self.embed_workers = embed_workers
+        self.max_latency = max_latency
+        self.target_embed_seconds = target_embed_seconds
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.rows_written = 0
+        self.failed_ids = []
+
+    @property
+    def rows_failed(self) -> int:
+        return len(self.failed_ids)
+
+    def run(self, rows: Iterable[Row], desc: str = "Embedding Documents") -> int:
+        """
+        Returns:
+            the number of rows written to the table
+        """
+        with ThreadPoolExecutor(max_workers=self.embed_workers) as executor, \
+                tqdm(desc=desc, unit="doc") as progress_bar:
+            pending = deque()
+            for batch in self.record_batches(rows):
+                pending.append((executor.submit(self._embed, batch), batch))
+                if len(pending) >= 2 * self.embed_workers:
+                    self._write(*pending.popleft(), progress_bar)
+            while pending:
+                self._write(*pending.popleft(), progress_bar)
+        if self.failed_ids:
+            self.logger.error(f"{len(self.failed_ids)} rows could not be written to the vector store.")
+        return self.rows_written
+
+    def record_batches(self, rows: Iterable[Row]) -> Iterator[pa.RecordBatch]:
+        """
+        Groups rows into column-wise RecordBatches matching TableSchema, without the vector column. Rows whose
+        id is already stored (see TableSync) are dropped before they are batched.
+        """
+        columns = [[] for _ in range(6)]
+        deadline = None
+        for row in rows:
+            row_id = document_id(row)
+            if self.sync is not None and not self.sync.should_embed(row_id):
+                continue
+            if deadline is None:
+                deadline = time.monotonic() + self.max_latency
+            columns[0].append(row_id)
+            for column, value in zip(columns[1:], row):
+                column.append(value)
+            if len(columns[0]) >= self.batch_size or time.monotonic() >= deadline:
+                yield _to_record_batch(columns)
+                columns = [[] for _ in range(6)]
+                deadline = None
+        if columns[0]:
+            yield _to_record_batch(columns)
+
+    def _embed(self, batch: pa.RecordBatch) -> tuple[pa.RecordBatch, float]:
+        start = time.perf_counter()
+        return embed_record_batch(batch), time.perf_counter() - start
+
+    def _write(self, future, batch: pa.RecordBatch, progress_bar):
+        try:
+            embedded, seconds = future.result()
+            self._adapt_batch_size(batch.num_rows, seconds)
+        except Exception as e:
+            self.logger.warning(f"Embedding a batch of {batch.num_rows} rows failed: {e}")
+            embedded = None
+        self._add(batch, embedded, self.max_retries)
+        progress_bar.update(batch.num_rows)
+
+    def _add(self, batch: pa.RecordBatch, embedded: pa.RecordBatch | None, retries: int):
+        for attempt in range(retries + 1):
+            try:
+                if embedded is None:
+                    embedded = embed_record_batch(batch)
+                self.table.add(embedded)
+                self.rows_written += batch.num_rows
+                return
+            except Exception as e:
+                self.logger.warning(f"Writing {batch.num_rows} rows failed (attempt {attempt + 1}): {e}")
+                if attempt < retries:
+                    time.sleep(self.retry_backoff * 2 ** attempt)
+
+        self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+        if batch.num_rows > 1:
+            middle = batch.num_rows // 2
+            # The halves are not retried again, they only isolate the rows that keep failing
+            for offset, length in ((0, middle), (middle, batch.num_rows - middle)):
+                self._add(batch.slice(offset, length), embedded.slice(offset, length) if embedded is not None else None, 0)
+        else:
+            # The row is not stored, so the next incremental fill picks it up again
+            self.failed_ids.append(batch.column("id")[0].as_py())
+            self.logger.error(f"Giving up on row {self.failed_ids[-1]}.")
+
+    def _adapt_batch_size(self, embedded: int, seconds: float):
+        # Scale towards the size that takes target_embed_seconds, but never by more than 2x at once
+        if embedded < self.batch_size or seconds <= 0:
+            return
+        factor = min(2.0, max(0.5, self.target_embed_seconds / seconds))
+        self.batch_size = int(min(self.max_batch_size, max(self.min_batch_size, self.batch_size * factor)))
+
+
+def benchmark(rows: int = 20_000, queries: int = 200):
+    """
+    Measures embedding throughput, ingestion and query latency of the configured backend on synthetic rows in a
+    temporary database, e.g. `EMBEDDING_BACKEND=hashing python -m src.vector_store.ingestion`.
+    """
+    texts = [f"movie {i} directed by person {i % 977} in genre {i % 31}" for i in range(rows)]
+    start = time.perf_counter()
+    func.compute_source_embeddings(texts[:1000])
+    embed_seconds = time.perf_counter() - start
+    print(f"{type(func).__name__} ({func.ndims()} dims): {1000 / embed_seconds:.0f} texts/s")
+
+    table = lancedb.connect(tempfile.mkdtemp()).create_table("benchmark", schema=TableSchema)
+    start = time.perf_counter()
+    IngestionPipeline(table).run(((text, f"Q{i}", text, "", "entity") for i, text in enumerate(texts)), "Ingesting")
+    print(f"ingested {rows} rows in {time.perf_counter() - start:.1f}s")
+
+    latency = []
+    for text in texts[:queries]:
+        start = time.perf_counter()
+        table.search(func.compute_query_embeddings(text)[0]).limit(5).to_list()
+        latency.append((time.perf_counter() - start) * 1000)
+    print(f"query (embed + search) p50 {np.percentile(latency, 50):.2f}ms  p95 {np.percentile(latency, 95):.2f}ms")
+
+
+if __name__ == "__main__":
+    benchmark(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,70 @@
+from typing import List
+
+from ..term_dictionary import normalize_label
+from .fuzzy_index import FUZZY_MIN_CONFIDENCE, FuzzyLabelIndex
+
+
+class LabelIndex:
+    """
+    Exact label lookup on case and punctuation folded labels (see normalize_label).
+
+    Buckets map a normalized label to tab separated entity URIs, so labels shared by several entities keep
+    all candidates. Results have the same shape as LanceDB search rows with a distance of 0. With a
+    FuzzyLabelIndex over the bucket keys, fuzzy_lookup also resolves labels with typos.
+    """
+
+    def __init__(self, buckets, entity2label, entity2description=None, entry_type: str = '',
+                 fuzzy_index: FuzzyLabelIndex | None = None):
+        self.buckets = buckets
+        self.entity2label = entity2label
+        self.entity2description = entity2description
+        self.entry_type = entry_type
+        self.fuzzy_index = fuzzy_index
+
+    def add(self, label: str, entity: str):
+        key = normalize_label(label)
+        existing = self.buckets.get(key)
+        if existing is None:
+            self.buckets[key] = entity
+        elif entity not in existing.split("\t"):
+            self.buckets[key] = existing + "\t" + entity
+
+    def fuzzy_lookup(self, label: str, k: int = 1, min_confidence: float = FUZZY_MIN_CONFIDENCE) -> List[dict]:
+        """
+        Rows of the closest indexed label, with _distance set to 1 - confidence and the confidence in _confidence.
+        Empty if there is no fuzzy index or no label is close enough.
+        """
+        if self.fuzzy_index is None:
+            return []
+        match = self.fuzzy_index.match(label, min_confidence)
+        if match is None:
+            return []
+        matched_label, confidence = match
+        rows = self.lookup(matched_label, k)
+        for row in rows:
+            row["_distance"] = 1 - confidence
+            row["_confidence"] = confidence
+        return rows
+
+    def lookup(self, label: str, k: int = 1) -> List[dict]:
+        bucket = self.buckets.get(normalize_label(label))
+        if not bucket:
+            return []
+
+        rows = []
+        for entity in bucket.split("\t"):
+            entity_label = self.entity2label.get(entity, label)
+            rows.append({
+                "id": "",
+                "text": entity_label,
+                "metadata": {
+                    "entity": entity,
+                    "label": entity_label,
+                    "description": self.entity2description.get(entity, "") if self.entity2description else "",
+                    "type": self.entry_type,
+                },
+                "_distance": 0.0,
+            })
+        # Candidates whose label matches without folding come first
+        rows.sort(key=lambda row: row["metadata"]["label"] != label)
+        return rows[:k]
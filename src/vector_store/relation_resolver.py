@@ -0,0 +1,114 @@
+import threading
+from typing import List
+
+import numpy as np
+
+from ..lru_cache import LRUCache
+from ..term_dictionary import normalize_label
+from .label_index import LabelIndex
+
+MOVIE_RELATION_FILTER = "(LOWER(metadata.description) LIKE '%movie%' OR LOWER(metadata.description) LIKE '%film%')"
+
+
+class RelationResolver:
+    """
+    Resolves relation phrases in memory, tier by tier:
+
+    1. a cache of earlier results, keyed by the normalized phrase
+    2. the relation label index (normalized labels and synonyms, exact or fuzzy)
+    3. one dot product against the movie relation vectors of the relations table, held as a NumPy matrix
+
+    A tier that is not confident enough returns nothing, and the caller falls back to the LanceDB search with
+    reranking (and hands its result to remember()). The vector tier only answers when the best relation is
+    both very similar to the phrase and clearly ahead of the second best one; everything else is left to the
+    reranker. Rows are always returned as copies, so callers may modify them without changing the cache.
+    """
+
+    def __init__(self, relations_table, label_index: LabelIndex, min_similarity: float = 0.85,
+                 min_margin: float = 0.05, cache_size: int = 4096):
+        self.label_index = label_index
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.cache = LRUCache(cache_size)
+        self.stats_lock = threading.Lock()
+        self.resolved = {"cache": 0, "label": 0, "vector": 0, "fallback": 0}
+
+        rows = (relations_table.search().where(MOVIE_RELATION_FILTER)
+                .select(["vector", "text", "metadata"]).limit(None).to_arrow())
+        self.metadata = rows["metadata"].to_pylist()
+        self.texts = rows["text"].to_pylist()
+        if len(rows) > 0:
+            vectors = rows["vector"].combine_chunks()
+            self.vectors = vectors.flatten().to_numpy().reshape(len(rows), vectors.type.list_size).astype(np.float32)
+        else:
+            self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.vector_norms = np.linalg.norm(self.vectors, axis=1)
+
+    def lookup(self, phrase: str, k: int = 1) -> List[dict]:
+        """
+        Cached or label index rows for the phrase, without embedding it.
+        """
+        key = (normalize_label(phrase), k)
+        rows = self.cache.get(key)
+        if rows is not None:
+            self._count("cache")
+            return _copy_rows(rows)
+        rows = self.label_index.lookup(phrase, k) or self.label_index.fuzzy_lookup(phrase, k)
+        if rows:
+            self._count("label")
+            self.cache.put(key, _copy_rows(rows))
+        return rows
+
+    def nearest(self, phrase: str, query_vector: np.ndarray, k: int = 1) -> List[dict]:
+        """
+        The k most similar movie relations by cosine similarity, one row per relation. Empty when the best
+        similarity is below min_similarity, or when the best different relation is within min_margin of it.
+        """
+        if len(self.vectors) == 0:
+            return []
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        dots = self.vectors @ query_vector
+        similarities = dots / np.maximum(self.vector_norms * np.linalg.norm(query_vector), 1e-12)
+        order = np.argsort(-similarities)
+        if similarities[order[0]] < self.min_similarity:
+            return []
+
+        # One index per relation, best first, and at least two so the margin to the runner-up can be checked
+        best = []
+        for index in order.tolist():
+            if all(self.metadata[index]["entity"] != self.metadata[other]["entity"] for other in best):
+                best.append(index)
+                if len(best) == max(k, 2):
+                    break
+        if len(best) > 1 and similarities[best[0]] - similarities[best[1]] < self.min_margin:
+            return []
+
+        rows = []
+        for index in best[:k]:
+            distance = float(self.vector_norms[index] ** 2 - 2 * dots[index] + query_vector @ query_vector)
+            rows.append({"id": "", "text": self.texts[index], "metadata": dict(self.metadata[index]),
+                         "_distance": distance, "_confidence": float(similarities[index])})
+        self._count("vector")
+        self.cache.put((normalize_label(phrase), k), _copy_rows(rows))
+        return rows
+
+    def remember(self, phrase: str, k: int, rows: List[dict]):
+        """
+        Caches the rows the caller found on the fallback path.
+        """
+        self._count("fallback")
+        if rows:
+            self.cache.put((normalize_label(phrase), k), _copy_rows(rows))
+
+    def _count(self, tier: str):
+        with self.stats_lock:
+            self.resolved[tier] += 1
+
+    def stats(self) -> dict:
+        with self.stats_lock:
+            return dict(self.resolved, relations=len(self.vectors))
+
+
+def _copy_rows(rows: List[dict]) -> List[dict]:
+    return [dict(row, metadata=dict(row["metadata"])) if isinstance(row.get("metadata"), dict) else dict(row)
+            for row in rows]
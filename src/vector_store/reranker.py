@@ -0,0 +1,87 @@
+import logging
+import threading
+import time
+
+import pyarrow as pa
+from lancedb.rerankers import CrossEncoderReranker
+
+from ..lru_cache import LRUCache
+
+DEFAULT_RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L12-v2"
+
+
+class CachedCrossEncoderReranker(CrossEncoderReranker):
+    """
+    CrossEncoderReranker that scores candidates in batches, caches (query, candidate) scores and keeps
+    timing counters. Instances are shared through get_reranker so the model is only loaded once.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_RERANKER_MODEL, batch_size: int = 32, cache_size: int = 50_000,
+                 **kwargs):
+        super().__init__(model_name, **kwargs)
+        self.logger = logging.getLogger(__name__)
+        self.batch_size = batch_size
+        self.score_cache = LRUCache(cache_size)
+        self.stats_lock = threading.Lock()
+        self.requests = 0
+        self.pairs_scored = 0
+        self.total_seconds = 0.0
+        self.last_request_seconds = 0.0
+
+    def warm_up(self):
+        """
+        Loads the model and runs one prediction so the first user request does not pay for it.
+        """
+        start = time.perf_counter()
+        self.model.predict([["warm up", "warm up"]], batch_size=1)
+        self.logger.info(f"Reranker {self.model_name} warmed up in {time.perf_counter() - start:.2f}s")
+
+    def _rerank(self, result_set: pa.Table, query: str):
+        result_set = self._handle_empty_results(result_set)
+        if len(result_set) == 0:
+            return result_set
+
+        start = time.perf_counter()
+        passages = result_set[self.column].to_pylist()
+        scores = [self.score_cache.get((query, passage)) for passage in passages]
+        missing = [index for index, score in enumerate(scores) if score is None]
+        if missing:
+            predicted = self.model.predict([[query, passages[index]] for index in missing], batch_size=self.batch_size)
+            for index, score in zip(missing, predicted):
+                scores[index] = float(score)
+                self.score_cache.put((query, passages[index]), scores[index])
+
+        elapsed = time.perf_counter() - start
+        with self.stats_lock:
+            self.requests += 1
+            self.pairs_scored += len(missing)
+            self.total_seconds += elapsed
+            self.last_request_seconds = elapsed
+        self.logger.debug(f"Reranked {len(passages)} candidates ({len(missing)} scored) in {elapsed * 1000:.1f}ms")
+
+        return result_set.append_column("_relevance_score", pa.array(scores, type=pa.float32()))
+
+    def stats(self) -> dict:
+        with self.stats_lock:
+            return {
+                "requests": self.requests,
+                "pairs_scored": self.pairs_scored,
+                "total_seconds": self.total_seconds,
+                "avg_request_seconds": self.total_seconds / self.requests if self.requests else 0.0,
+                "last_request_seconds": self.last_request_seconds,
+                "score_cache": self.score_cache.stats(),
+            }
+
+
+_rerankers = {}
+_rerankers_lock = threading.Lock()
+
+
+def get_reranker(model_name: str = DEFAULT_RERANKER_MODEL) -> CachedCrossEncoderReranker:
+    """
+    Returns the process-wide reranker for model_name, creating it on first use.
+    """
+    with _rerankers_lock:
+        if model_name not in _rerankers:
+            _rerankers[model_name] = CachedCrossEncoderReranker(model_name)
+        return _rerankers[model_name]
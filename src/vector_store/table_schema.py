@@ -1,19 +1,15 @@
 import logging
-import os
 from typing import Optional
 
-from lancedb.embeddings import get_registry
 from lancedb.pydantic import LanceModel, Vector
 
+from .embedding_backends import create_embedding_function
+
 logging.getLogger("httpx").setLevel(logging.ERROR)  # or logging.ERROR to suppress more
 
 # https://lancedb.github.io/lancedb/embeddings/default_embedding_functions
-# Ollama host is only set if defined in environment variables -> needed for containerization
-if os.getenv("OLLAMA_HOST"):
-    func = get_registry().get("ollama").create(name="snowflake-arctic-embed:335m",
-                                               host=os.getenv("OLLAMA_HOST"))
-else:
-    func = get_registry().get("ollama").create(name="snowflake-arctic-embed:335m")
+# The backend (ollama, sentence-transformers, hashing) is chosen with EMBEDDING_BACKEND, see embedding_backends
+func = create_embedding_function()
 
 class Metadata(LanceModel):
     entity: str
@@ -26,4 +22,7 @@ class TableSchema(LanceModel):
     id: str
     text: str = func.SourceField()
     metadata: Optional[Metadata] = None
+    # Flat copies of metadata.label/type: LanceDB cannot build scalar indexes on struct fields
+    label: Optional[str] = None
+    type: Optional[str] = None
 
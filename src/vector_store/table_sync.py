@@ -0,0 +1,55 @@
+import threading
+
+import xxhash
+
+
+def document_id(fields) -> str:
+    """
+    Deterministic id of a document from its text and metadata fields: the same content always hashes to the
+    same id. This is the only id scheme of the vector store tables.
+    """
+    return xxhash.xxh64("\x1f".join(fields).encode("utf-8")).hexdigest()
+
+
+class TableSync:
+    """
+    Tracks which documents of a fill run are already stored in a table. Document ids are content hashes,
+    so an id that already exists means the document is unchanged and does not need to be embedded again.
+    Ids that exist in the table but were not produced by the run belong to removed or changed documents.
+    """
+
+    def __init__(self, table, delete_chunk_size: int = 500):
+        self.table = table
+        self.delete_chunk_size = delete_chunk_size
+        self.existing_ids = set(table.search().select(["id"]).limit(None).to_arrow()["id"].to_pylist())
+        self.seen_ids = set()
+        self.skipped = 0
+        self.embedded = 0
+        self.lock = threading.Lock()
+
+    def should_embed(self, document_id: str) -> bool:
+        with self.lock:
+            if document_id in self.seen_ids or document_id in self.existing_ids:
+                self.seen_ids.add(document_id)
+                self.skipped += 1
+                return False
+            self.seen_ids.add(document_id)
+            self.embedded += 1
+            return True
+
+    def delete_stale(self) -> int:
+        """
+        Deletes the rows whose ids were not seen in this run.
+
+        Returns:
+            the number of deleted rows
+        """
+        stale_ids = sorted(self.existing_ids - self.seen_ids)
+        for start in range(0, len(stale_ids), self.delete_chunk_size):
+            chunk = stale_ids[start:start + self.delete_chunk_size]
+            self.table.delete("id IN (" + ", ".join(f"'{document_id}'" for document_id in chunk) + ")")
+        return len(stale_ids)
+
+    def summary(self, name: str, deleted: int, failed: int = 0) -> str:
+        return (f"{name}: {self.embedded - failed} embedded, {self.skipped} unchanged (skipped), {deleted} deleted"
+                + (f", {failed} failed" if failed else ""))
@@ -1,36 +1,44 @@
 import csv
 import logging
 import os
-import uuid
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import sys
 from typing import List
 
 import lancedb
-import rdflib
 import xxhash
-from lancedb.rerankers import CrossEncoderReranker
-from langchain_core.documents import Document
-from tqdm import tqdm
 
-from .batch_inserter import BatchInserter
-from .table_schema import TableSchema
+from ..term_dictionary import get_term_dictionaries, is_relation, label_buckets
+from .embedding_backends import vector_db_name
+from .embedding_cache import EmbeddingCache
+from .fuzzy_index import FuzzyLabelIndex, load_or_build_fuzzy_index
+from .index_manager import IndexManager
+from .ingestion import IngestionPipeline
+from .label_index import LabelIndex
+from .relation_resolver import MOVIE_RELATION_FILTER, RelationResolver
+from .reranker import get_reranker
+from .table_schema import TableSchema, func
+from .table_sync import TableSync
 
 
 class VectorStore:
     def __init__(self):
         base_dir = os.path.dirname(__file__)
-        self.vector_db_path = os.path.join(base_dir, '..', '..', 'data', 'lancedb')
+        self.vector_db_path = os.path.join(base_dir, '..', '..', 'data', vector_db_name())
         self.entities_table_name = 'entities'
         self.movies_properties_table_name = 'movie_properties'
         self.movies_labels_table_name = 'movie_labels'
         self.movie_relations_table_name = 'relations'
         self.vector_db = lancedb.connect(self.vector_db_path)
+        self.index_manager = IndexManager(self.vector_db)
         self.entities_table = self._instantiate_table(self.entities_table_name)
         self.movie_properties_table = self._instantiate_table(self.movies_properties_table_name)
         self.movie_labels_table = self._instantiate_table(self.movies_labels_table_name)
         self.relations_table = self._instantiate_table(self.movie_relations_table_name)
 
         self.logger = logging.getLogger(__name__)
+        self.reranker = get_reranker()
+        self.embedding_cache = EmbeddingCache(func, os.path.join(self.vector_db_path, '..', 'embedding_cache'),
+                                              self._compute_hash)
 
         self.synonyms = {
                 "award": ["award",
@@ -89,258 +97,177 @@ class VectorStore:
                           "genre"],
             }
 
-        self.entity2label = {}
-        self.label2entity = {}
-        self.entity2description = {}
         self._load_entity_label_mapping()
+        self.relation_resolver = RelationResolver(self.relations_table, self.relation_label_index)
+
+    def warm_up(self):
+        self.reranker.warm_up()
 
     def find_similar_relation(self, estimated_label: str, k=1) -> List[dict]:
         print("relation estimate: " + estimated_label)
-        # Search lanceDb for exact match first
-        exact_matches = (self.relations_table.search(query=estimated_label)
-                         .where(f"(LOWER(metadata.label) IN ('{estimated_label.lower()}'))")
-                         .limit(1).to_list())
-        if exact_matches:
-            return exact_matches
-        return (self.relations_table.search(query=estimated_label)
-                .where(f"(LOWER(metadata.description) LIKE '%movie%' OR LOWER(metadata.description) LIKE '%film%')")
-                .rerank(CrossEncoderReranker("cross-encoder/ms-marco-MiniLM-L12-v2")).limit(k).to_list())
+        # Cached, label index or in-memory vector match first; LanceDB search and reranking only when unsure
+        matches = (self.relation_resolver.lookup(estimated_label, k)
+                   or self.relation_resolver.nearest(estimated_label, self._embed_query(estimated_label), k))
+        if matches:
+            return matches
+        matches = (self._vector_search(self.relations_table, estimated_label)
+                   .where(MOVIE_RELATION_FILTER)
+                   .rerank(self.reranker, query_string=estimated_label).limit(k).to_list())
+        self.relation_resolver.remember(estimated_label, k, matches)
+        return matches
 
     def find_similar_entity(self, estimated_label: str, k=1) -> List[dict]:
         print("entity estimate: " + estimated_label)
-        # Search lanceDb for exact match first
-        exact_matches = (self.entities_table.search(query=estimated_label)
-                         .where(f"(LOWER(metadata.label) IN ('{estimated_label.lower()}'))")
-                         .limit(1).to_list())
+        # Exact (normalized) or near-exact label match first, without embedding the query
+        exact_matches = (self.entity_label_index.lookup(estimated_label)
+                         or self.entity_label_index.fuzzy_lookup(estimated_label))
         if exact_matches:
             return exact_matches
-        return (self.entities_table.search(query=estimated_label)
-                .rerank(CrossEncoderReranker("cross-encoder/ms-marco-MiniLM-L12-v2")).limit(k).to_list())
+        return (self._vector_search(self.entities_table, estimated_label)
+                .rerank(self.reranker, query_string=estimated_label).limit(k).to_list())
 
     def find_movie_with_label(self, label: str) -> List[dict]:
-        exact_matches = (self.movie_labels_table.search(query=label)
-                         .where(f"(LOWER(metadata.label) IN ('{label.lower()}'))")
-                         .limit(1).to_list())
+        exact_matches = self.movie_label_index.lookup(label) or self.movie_label_index.fuzzy_lookup(label)
         if exact_matches:
             return exact_matches
-        return (self.movie_labels_table.search(query=label)
+        return (self._vector_search(self.movie_labels_table, label)
                 .limit(1).to_list())
 
     def find_similar_movies(self, movie_properties: str, exclude_labels: list[str], k=5) -> List[dict]:
         if len(exclude_labels) == 0:
             return  (self.movie_properties_table.search(query=movie_properties, query_type="fts")
-                .rerank(CrossEncoderReranker("cross-encoder/ms-marco-MiniLM-L12-v2")).limit(k).to_list())
-        return (self.movie_properties_table.search(query=movie_properties,
-                                                   query_type="hybrid",
-                                                   vector_column_name="vector",
-                                                   fts_columns="text",)
-                .where(f"metadata.label NOT IN {str(exclude_labels).replace('[', '(').replace(']', ')')}")
-                .rerank(CrossEncoderReranker("cross-encoder/ms-marco-MiniLM-L12-v2")).limit(k).to_list())
-
-    def fill_relations_vector_store(self):
-        batcher = BatchInserter(self.relations_table)
-        batcher.start()
-        with ThreadPoolExecutor(max_workers=12) as executor:
-            futures = {
-                executor.submit(self._process_relation, label, entity, batcher): label
-                for label, entity in self.label2entity.items()
-                if entity.split('/')[-1].startswith('P')
-            }
-            for future in tqdm(as_completed(futures), total=len(futures), desc="Embedding Relations"):
-                label = futures[future]
-                try:
-                    future.result()
-                except Exception as e:
-                    self.logger.error(f"Error while processing entity {label}: {e}")
-
-        batcher.finish()
-        self.logger.debug("Vectorization complete.")
-
-    def fill_entities_vector_store(self):
-        batcher = BatchInserter(self.entities_table)
-        batcher.start()
-        with ThreadPoolExecutor(max_workers=12) as executor:
-            futures = {
-                executor.submit(self._process_entities, label, entity, batcher): label
-                for label, entity in self.label2entity.items()
-                if not entity.split('/')[-1].startswith('P')
-            }
-            for future in tqdm(as_completed(futures), total=len(futures), desc="Embedding Entities"):
-                label = futures[future]
-                try:
-                    future.result()
-                except Exception as e:
-                    self.logger.error(f"Error while processing entity {label}: {e}")
-
-        batcher.finish()
-        self.logger.debug("Vectorization complete.")
-
-    def fill_movie_properties_vector_store(self):
-        batcher = BatchInserter(self.movie_properties_table, batch_size=200)
-        batcher.start()
-
-        vect_dir = os.path.dirname(__file__)
-        src_dir = os.path.dirname(vect_dir)
-        base_dir = os.path.dirname(src_dir)
-        movies = {}
-        with open(os.path.join(base_dir, 'data', 'movies_with_properties.csv'), 'r', encoding="utf-8") as csv_file:
-            rows = csv.reader(csv_file)
-            for row in rows:
-                # Create a string for each movie with its properties
-                movies[row[1]] = {
-                    "label": row[0],
-                    "properties": ', '.join([prop for prop in row[2:]])
-                }
-                print(movies[row[1]]["properties"])
-
-
-        with ThreadPoolExecutor(max_workers=12) as executor:
-            futures = {
-                executor.submit(self._process_movie_properties, entity, data["properties"], data["label"], batcher): entity
-                for entity, data in movies.items()
-            }
-            for future in tqdm(as_completed(futures), total=len(futures), desc="Embedding Movie Properties"):
-                entity = futures[future]
-                try:
-                    future.result()
-                except Exception as e:
-                    self.logger.error(f"Error while processing entity {entity}: {e}")
-
-        batcher.finish()
-        # Create FTS index on 'page_content' for movie_properties_table
-        self.movie_properties_table.create_fts_index("text")
-
-        self.logger.debug("Vectorization complete.")
-
-    def fill_movie_labels_vector_store(self):
-        batcher = BatchInserter(self.movie_labels_table, batch_size=200)
-        batcher.start()
-
+                .rerank(self.reranker).limit(k).to_list())
+        query = (self.movie_properties_table.search(query_type="hybrid",
+                                                    vector_column_name="vector",
+                                                    fts_columns="text",)
+                 .vector(self._embed_query(movie_properties))
+                 .text(movie_properties))
+        return (self.index_manager.tune(self.movies_properties_table_name, query)
+                .where(f"label NOT IN {str(exclude_labels).replace('[', '(').replace(']', ')')}")
+                .rerank(self.reranker).limit(k).to_list())
+
+    def fill_relations_vector_store(self, incremental: bool = True):
+        rows = ((f"{label}: {self.entity2description.get(entity, '')}", entity, label,
+                 self.entity2description.get(entity, ""), "relation")
+                for label, entity in self.label2entity.items() if is_relation(entity))
+        self.relations_table = self._fill_table(self.movie_relations_table_name, rows, incremental,
+                                                "Embedding Relations")
+
+    def fill_entities_vector_store(self, incremental: bool = True):
+        rows = ((label, entity, label, self.entity2description.get(entity, ""), "entity")
+                for label, entity in self.label2entity.items() if not is_relation(entity))
+        self.entities_table = self._fill_table(self.entities_table_name, rows, incremental, "Embedding Entities")
+
+    def fill_movie_properties_vector_store(self, incremental: bool = True):
+        # Each movie is embedded as the comma separated list of its properties
+        rows = ((properties, entity, label, properties, '')
+                for label, entity, properties in self._read_movies(lambda row: ', '.join(row[2:])))
+        self.movie_properties_table = self._fill_table(self.movies_properties_table_name, rows, incremental,
+                                                       "Embedding Movie Properties", batch_size=200)
+        self.movie_properties_table.create_fts_index("text", replace=True)
+
+    def fill_movie_labels_vector_store(self, incremental: bool = True):
+        rows = ((label, entity, label, '', '') for label, entity, _ in self._read_movies(lambda row: ''))
+        self.movie_labels_table = self._fill_table(self.movies_labels_table_name, rows, incremental,
+                                                   "Embedding Movie Labels", batch_size=200)
+
+    def _read_movies(self, properties):
         vect_dir = os.path.dirname(__file__)
         src_dir = os.path.dirname(vect_dir)
         base_dir = os.path.dirname(src_dir)
-        movies = {}
         with open(os.path.join(base_dir, 'data', 'movies_with_properties.csv'), 'r', encoding="utf-8") as csv_file:
-            rows = csv.reader(csv_file)
-            for row in rows:
-                # Create a string for each movie with its properties
-                movies[row[1]] = row[0]
-
-        with ThreadPoolExecutor(max_workers=12) as executor:
-            futures = {
-                executor.submit(self._process_movie_labels, entity, label, batcher): entity
-                for entity, label in movies.items()
-            }
-            for future in tqdm(as_completed(futures), total=len(futures), desc="Embedding Movie Labels"):
-                entity = futures[future]
-                try:
-                    future.result()
-                except Exception as e:
-                    self.logger.error(f"Error while processing entity {entity}: {e}")
-
-        batcher.finish()
+            for row in csv.reader(csv_file):
+                yield row[0], row[1], properties(row)
+
+    def _fill_table(self, table_name: str, rows, incremental: bool, desc: str, batch_size: int = 256):
+        # A full rebuild starts from an empty table, an incremental one keeps the rows whose content is unchanged
+        if incremental:
+            table = self._instantiate_table(table_name)
+        else:
+            table = self.vector_db.create_table(table_name, schema=TableSchema, mode="overwrite")
+        sync = TableSync(table)
+        pipeline = IngestionPipeline(table, sync, batch_size=batch_size)
+        pipeline.run(rows, desc)
+        deleted = sync.delete_stale()
+        print(sync.summary(table_name, deleted, pipeline.rows_failed))
+        if pipeline.rows_failed:
+            # The missing rows are embedded again by the next incremental fill
+            raise RuntimeError(f"{table_name}: {pipeline.rows_failed} rows could not be written, e.g. "
+                               f"{', '.join(pipeline.failed_ids[:5])}")
         self.logger.debug("Vectorization complete.")
+        return table
 
-    def _process_relation(self, entity_label: str, entity_uri: str, batcher: BatchInserter):
-        try:
-            description = self.entity2description.get(entity_uri, "")
-
-            document = Document(
-                id=uuid.uuid4().hex,
-                page_content=f"{entity_label}: {description}",
-                metadata={
-                    "entity": entity_uri,
-                    "label": entity_label,
-                    "description": description,
-                    "type": "relation",
-                    }
-                )
-            batcher.add_document(document)
-        except Exception as e:
-            self.logger.error(f"Error processing entity {entity_label}: {e}")
-
-    def _process_movie_properties(self, entity_uri: str, properties: str, label: str, batcher: BatchInserter):
-        try:
-            document = Document(
-                id=uuid.uuid4().hex,
-                page_content=properties,
-                metadata={
-                    "entity": entity_uri,
-                    "label": label,
-                    "description": properties,
-                    "type": '',
-                }
-            )
-            batcher.add_document(document)
-        except Exception as e:
-            self.logger.error(f"Error processing entity {entity_uri}: {e}")
-
-    def _process_movie_labels(self, entity_uri: str, label: str, batcher: BatchInserter):
-        try:
-            document = Document(
-                id=uuid.uuid4().hex,
-                page_content=label,
-                metadata={
-                    "entity": entity_uri,
-                    "label": label,
-                    "description": '',
-                    "type": '',
-                }
-            )
-            batcher.add_document(document)
-        except Exception as e:
-            self.logger.error(f"Error processing entity {entity_uri}: {e}")
+    def _compute_hash(self, text):
+        return xxhash.xxh64(text.encode("utf-8")).hexdigest()
 
-    def _process_entities(self, entity_label: str, entity_uri: str, batcher: BatchInserter):
-        try:
-            description = self.entity2description.get(entity_uri, "")
+    def _vector_search(self, table, text: str):
+        return self.index_manager.tune(table.name, table.search(self._embed_query(text)))
 
-            document = Document(
-                id=uuid.uuid4().hex,
-                page_content=f"{entity_label}",
-                metadata={
-                    "entity": entity_uri,
-                    "label": entity_label,
-                    "description": description,
-                    "type": "entity",
-                    }
-                )
-            batcher.add_document(document)
-        except Exception as e:
-            self.logger.error(f"Error processing entity {entity_label}: {e}")
+    def _embed_query(self, text: str):
+        # Query vectors come from the embedding cache, so repeated texts never reach the embedding backend again
+        return self.embedding_cache.embed(text)
 
-    def _compute_hash(self, text):
-        return xxhash.xxh64(text).hexdigest()
+    def embedding_cache_stats(self) -> dict:
+        return self.embedding_cache.stats()
 
     def _load_entity_label_mapping(self):
-        vect_dir = os.path.dirname(__file__)
-        src_dir = os.path.dirname(vect_dir)
-        base_dir = os.path.dirname(src_dir)
-        with open(os.path.join(base_dir, 'data', 'entities.csv'), 'r', encoding="utf-8") as csv_file:
-            self.entity2label = {rdflib.term.URIRef(ent): label for ent, label in csv.reader(csv_file)}
-            self.label2entity = {v: k for k, v in self.entity2label.items()}
-
-        with open(os.path.join(base_dir, 'data', 'descriptions.csv'), 'r', encoding="utf-8") as csv_file:
-            self.entity2description = {rdflib.term.URIRef(ent): descr for ent, descr in csv.reader(csv_file)}
+        # The maps are shared, memory-mapped arrays; synonyms only go into this instance's overlays
+        term_dictionaries = get_term_dictionaries()
+        self.entity2label = term_dictionaries.entity2label
+        self.label2entity = term_dictionaries.label2entity.view()
+        self.entity2description = term_dictionaries.entity2description.view()
 
         for label, synonyms in self.synonyms.items():
             if label in self.label2entity:
                 entity_uri = self.label2entity[label]
-                self.entity2description[rdflib.term.URIRef(entity_uri)] = (
-                        self.entity2description.get(rdflib.term.URIRef(entity_uri), "") + " (movie)")
+                self.entity2description[entity_uri] = self.entity2description.get(entity_uri, "") + " (movie)"
                 for synonym in synonyms:
-                    self.label2entity[synonym] = rdflib.term.URIRef(entity_uri)
+                    self.label2entity[synonym] = entity_uri
+
+        entity_buckets = term_dictionaries.normalized_entity_labels
+        entity_fuzzy_index = load_or_build_fuzzy_index(
+            os.path.join(term_dictionaries.cache_dir, "fuzzy_entity_labels"),
+            os.path.join(term_dictionaries.cache_dir, "normalized_entity_labels_key_blob.npy"), entity_buckets.keys())
+        self.entity_label_index = LabelIndex(entity_buckets, self.entity2label, self.entity2description, "entity",
+                                             entity_fuzzy_index)
+        self.relation_label_index = LabelIndex(term_dictionaries.normalized_relation_labels.view(), self.entity2label,
+                                               self.entity2description, "relation")
+        for synonym, entity_uri in self.label2entity.overlay.items():
+            if is_relation(entity_uri):
+                self.relation_label_index.add(synonym, entity_uri)
+        # Relations and movies are small enough to index on every start, synonyms included
+        self.relation_label_index.fuzzy_index = FuzzyLabelIndex.build(self.relation_label_index.buckets.keys())
+        self.movie_label_index = self._load_movie_label_index()
+
+    def _load_movie_label_index(self) -> LabelIndex:
+        vect_dir = os.path.dirname(__file__)
+        src_dir = os.path.dirname(vect_dir)
+        base_dir = os.path.dirname(src_dir)
+        movies_path = os.path.join(base_dir, 'data', 'movies_with_properties.csv')
+        movie2label = {}
+        if os.path.exists(movies_path):
+            with open(movies_path, 'r', encoding="utf-8") as csv_file:
+                movie2label = {row[1]: row[0] for row in csv.reader(csv_file)}
+        buckets = label_buckets((label, entity) for entity, label in movie2label.items())
+        return LabelIndex(buckets, movie2label, fuzzy_index=FuzzyLabelIndex.build(buckets))
 
     def _instantiate_table(self, table_name: str):
         try:
-            return self.vector_db.open_table(table_name)
+            table = self.vector_db.open_table(table_name)
         except Exception as e:
             return self.vector_db.create_table(table_name, schema=TableSchema, mode="overwrite")
+        if "label" not in table.schema.names:
+            # Tables written before the flat label/type columns existed
+            table.add_columns({"label": "metadata.label", "type": "metadata.type"})
+        return table
 
 
 if __name__ == "__main__":
+    # Pass --full to drop the tables and re-embed everything instead of only new or changed documents
+    incremental = "--full" not in sys.argv
     vector_store = VectorStore()
-    vector_store.fill_movie_labels_vector_store()
-    vector_store.fill_movie_properties_vector_store()
-    vector_store.fill_relations_vector_store()
-    vector_store.fill_entities_vector_store()
+    vector_store.fill_movie_labels_vector_store(incremental)
+    vector_store.fill_movie_properties_vector_store(incremental)
+    vector_store.fill_relations_vector_store(incremental)
+    vector_store.fill_entities_vector_store(incremental)
+    vector_store.index_manager.build_all(rebuild=not incremental)
@@ -0,0 +1,75 @@
+import json
+import re
+import threading
+import time
+import urllib.request
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+
+class FakeOllamaServer:
+    """
+    Minimal stand-in for Ollama's /api/chat endpoint that streams a fixed answer word by word, with a delay before
+    the first token and between tokens, for measuring streaming without a model.
+    """
+
+    def __init__(self, answer: str, first_token_delay: float = 0.5, token_delay: float = 0.05):
+        tokens = re.findall(r"\S+\s*", answer)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                time.sleep(server.first_token_delay)
+                for index, token in enumerate(tokens):
+                    if index:
+                        time.sleep(server.token_delay)
+                    self._write({"message": {"role": "assistant", "content": token}, "done": False})
+                self._write({"message": {"role": "assistant", "content": ""}, "done": True, "done_reason": "stop",
+                             "prompt_eval_count": 1, "eval_count": len(tokens)})
+
+            def _write(self, body: dict):
+                body = {"model": "fake", "created_at": datetime.now(timezone.utc).isoformat(), **body}
+                self.wfile.write(json.dumps(body).encode("utf-8") + b"\n")
+                self.wfile.flush()
+
+            def log_message(self, *args):
+                pass
+
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self) -> "FakeOllamaServer":
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class StreamingChatClient:
+    """
+    Reads the NDJSON stream of /api/chat and yields chunks with a content attribute, like ChatOllama.stream.
+    """
+
+    def __init__(self, url: str, model: str = "fake"):
+        self.url = url
+        self.model = model
+
+    def stream(self, messages: list[dict]):
+        body = json.dumps({"model": self.model, "messages": messages, "stream": True}).encode("utf-8")
+        request = urllib.request.Request(f"{self.url}/api/chat", data=body,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request) as response:
+            for line in response:
+                message = json.loads(line)
+                yield SimpleNamespace(content=message["message"]["content"])
+                if message["done"]:
+                    return
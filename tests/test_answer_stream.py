@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from fake_ollama import FakeOllamaServer, StreamingChatClient
+from src.answer_stream import ChunkPoster, sentence_boundary, stream_answer
+
+ANSWER = ("The Godfather was directed by Francis F. Coppola. It was released in 1972 and is based on the novel by "
+          "Mario Puzo. Many consider it one of the greatest films ever made!")
+MESSAGES = [{"role": "user", "content": "Who directed The Godfather?"}]
+
+
+def stream_from_fake_server(llm_factory, first_token_delay=0.3, token_delay=0.05):
+    with FakeOllamaServer(ANSWER, first_token_delay, token_delay) as server:
+        posts = []
+        poster = ChunkPoster(posts.append)
+        start = time.perf_counter()
+        answer = stream_answer(llm_factory(server.url), MESSAGES, poster)
+        total_seconds = time.perf_counter() - start
+    return answer, posts, poster, total_seconds
+
+
+def assert_streamed(answer, posts, poster, total_seconds):
+    assert answer == ANSWER
+    assert " ".join(posts) == " ".join(ANSWER.split())
+    assert posts[0] == "The Godfather was directed by Francis F. Coppola."
+    assert len(posts) == 3
+    # The first sentence is posted after about a third of the tokens, not after the full completion
+    assert poster.first_post_seconds < 0.6 * total_seconds
+
+
+def test_first_sentence_is_posted_before_the_stream_ends():
+    assert_streamed(*stream_from_fake_server(StreamingChatClient))
+
+
+def test_first_sentence_is_posted_before_the_stream_ends_with_chat_ollama():
+    langchain_ollama = pytest.importorskip("langchain_ollama")
+    assert_streamed(*stream_from_fake_server(
+        lambda url: langchain_ollama.ChatOllama(model="fake", base_url=url)))
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("It was directed by F. Coppola. It was", "It was directed by F. Coppola."),
+    ("Dr. Strangelove is a comedy. It", "Dr. Strangelove is a comedy."),
+    ("Mr. Smith Goes to Washington is from 1939! It", "Mr. Smith Goes to Washington is from 1939!"),
+    ('He said "Hi." Then', 'He said "Hi."'),
+    ("It was released in 1972. ", None),
+    ("It was released in 1972. and", None),
+    ("It was shot in the U.S. Many", None),
+])
+def test_sentence_boundary(text, expected):
+    boundary = sentence_boundary(text)
+    assert (text[:boundary] if boundary is not None else None) == expected
+
+
+def test_poster_falls_back_to_word_boundaries_without_a_sentence_end():
+    posts = []
+    poster = ChunkPoster(posts.append, max_interval=0.0)
+    poster.feed("a long answer without")
+    poster.feed(" any sentence end")
+    poster.flush()
+    assert " ".join(posts) == "a long answer without any sentence end"
+    assert len(posts) > 1
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from src.embedding_index import QuantizedMatrix, blocked_top_k
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).standard_normal((2_000, 32)).astype(np.float32)
+
+
+@pytest.fixture
+def queries(vectors):
+    return vectors[:50] + 0.05 * np.random.default_rng(1).standard_normal((50, 32)).astype(np.float32)
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_blocked_quantized_search_matches_unblocked_search(vectors, queries, dtype):
+    quantized = QuantizedMatrix.quantize(vectors, dtype)
+    expected_ids, expected_distances = quantized.search(queries, vectors, 10, query_chunk_size=len(queries),
+                                                        row_chunk_size=len(vectors))
+    ids, distances = quantized.search(queries, vectors, 10, query_chunk_size=7, row_chunk_size=300)
+    np.testing.assert_array_equal(ids, expected_ids)
+    np.testing.assert_allclose(distances, expected_distances, rtol=1e-5)
+
+
+def test_rescored_quantized_search_finds_the_exact_neighbours(vectors, queries):
+    quantized = QuantizedMatrix.quantize(vectors, "int8")
+    partition = np.sort(np.random.default_rng(2).choice(len(vectors), size=700, replace=False))
+    partition = np.union1d(partition, np.arange(50))
+    exact_ids, exact_distances = blocked_top_k(queries, vectors[partition], 5)
+    ids, distances = quantized.search(queries, vectors, 5, ids=partition, query_chunk_size=16, row_chunk_size=128)
+    np.testing.assert_array_equal(ids, partition[exact_ids])
+    np.testing.assert_allclose(distances, exact_distances, rtol=1e-4, atol=1e-5)
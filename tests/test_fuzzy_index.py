@@ -0,0 +1,27 @@
+import pytest
+
+from src.vector_store.fuzzy_index import FuzzyLabelIndex, edit_distance, max_edits
+
+
+@pytest.fixture(scope="module")
+def index():
+    return FuzzyLabelIndex.build(["alien", "aliens", "the godfather", "the godfather part ii", "heat"])
+
+
+def test_match_exactly_at_the_threshold_is_accepted(index):
+    # One substitution in five characters is a confidence of exactly 0.8
+    assert index.match("alxen", min_confidence=0.8) == ("alien", pytest.approx(0.8))
+
+
+def test_match_below_the_threshold_is_rejected(index):
+    assert index.match("axxen", min_confidence=0.8) is None
+
+
+def test_transposition_counts_as_one_edit(index):
+    assert edit_distance("the godfahter", "the godfather", 2) == 1
+    assert index.match("the godfahter")[0] == "the godfather"
+
+
+@pytest.mark.parametrize("min_confidence, length, expected", [(0.8, 5, 1), (0.7, 10, 3), (0.9, 10, 1), (0.8, 4, 0)])
+def test_max_edits(min_confidence, length, expected):
+    assert max_edits(min_confidence, length) == expected
@@ -0,0 +1,36 @@
+import numpy as np
+from rdflib import Graph
+
+from src.graph_extractor import build_snapshot
+from src.graph_snapshot import GraphSnapshot
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+TRIPLES = f"""
+<http://www.wikidata.org/entity/Q47703> <http://www.w3.org/2000/01/rdf-schema#label> "The Godfather"@en .
+<http://www.wikidata.org/entity/Q47703> <http://www.w3.org/2000/01/rdf-schema#label> "Der Pate"@DE .
+<http://www.wikidata.org/entity/Q47703> <http://schema.org/description> "1972 film by Francis Ford Coppola" .
+<http://www.wikidata.org/entity/Q47703> <http://www.wikidata.org/prop/direct/P57> <http://www.wikidata.org/entity/Q56094> .
+<http://www.wikidata.org/entity/Q47703> <http://www.wikidata.org/prop/direct/P577> "1972-03-24"^^<{XSD}date> .
+<http://www.wikidata.org/entity/Q47703> <http://www.wikidata.org/prop/direct/P2047> "0175"^^<{XSD}integer> .
+<http://www.wikidata.org/entity/Q47703> <http://www.wikidata.org/prop/direct/P2047> "175"^^<{XSD}integer> .
+<http://www.wikidata.org/entity/Q47703> <http://www.wikidata.org/prop/direct/P2130> "6.0E6"^^<{XSD}double> .
+<http://www.wikidata.org/entity/Q47703> <http://www.wikidata.org/prop/direct/P5>  "1972-03-24T00:00:00Z"^^<{XSD}dateTime> .
+<http://www.wikidata.org/entity/Q47703> <http://www.wikidata.org/prop/direct/P6> "1.50"^^<{XSD}decimal> .
+<http://www.wikidata.org/entity/Q47703> <http://www.wikidata.org/prop/direct/P7> "quote \\" tab \\t \\u00e9"@en .
+<http://www.wikidata.org/entity/Q56094> <http://www.w3.org/2000/01/rdf-schema#label> "Francis Ford Coppola"@en .
+"""
+
+
+def test_parallel_and_rdflib_snapshots_store_the_same_terms(tmp_path):
+    graph_path = tmp_path / "graph.nt"
+    graph_path.write_text(TRIPLES * 3, encoding="utf-8")
+
+    graph = Graph()
+    graph.parse(str(graph_path), format="nt")
+    rdflib_snapshot = GraphSnapshot(str(graph_path), str(tmp_path / "rdflib_snapshot"))
+    rdflib_snapshot.save(graph)
+    parallel_snapshot = build_snapshot(str(graph_path), workers=2)
+
+    assert bytes(parallel_snapshot.term_blob) == bytes(rdflib_snapshot.term_blob)
+    np.testing.assert_array_equal(parallel_snapshot.term_offsets, rdflib_snapshot.term_offsets)
+    np.testing.assert_array_equal(parallel_snapshot.triples, rdflib_snapshot.triples)
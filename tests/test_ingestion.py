@@ -0,0 +1,55 @@
+import os
+import tempfile
+
+import pytest
+
+# The gateway imports the Ollama client libraries; the hashing backend keeps the test free of a server
+pytest.importorskip("langchain_ollama")
+os.environ.setdefault("EMBEDDING_BACKEND", "hashing")
+
+import lancedb
+
+from src.vector_store.ingestion import IngestionPipeline
+from src.vector_store.table_schema import TableSchema
+from src.vector_store.table_sync import document_id
+
+ROWS = [(f"movie {i}", f"Q{i}", f"movie {i}", "", "entity") for i in range(50)]
+
+
+class FlakyTable:
+    """
+    Wraps a table and fails add() for the first failures calls and for every batch containing bad_id.
+    """
+
+    def __init__(self, table, failures: int = 0, bad_id: str | None = None):
+        self.table = table
+        self.failures = failures
+        self.bad_id = bad_id
+
+    def add(self, batch):
+        if self.failures > 0:
+            self.failures -= 1
+            raise OSError("transient write error")
+        if self.bad_id in batch.column("id").to_pylist():
+            raise ValueError("bad row")
+        self.table.add(batch)
+
+
+@pytest.fixture
+def table():
+    return lancedb.connect(tempfile.mkdtemp()).create_table("ingestion", schema=TableSchema)
+
+
+def test_transient_write_errors_are_retried(table):
+    pipeline = IngestionPipeline(FlakyTable(table, failures=2), batch_size=16, retry_backoff=0)
+    assert pipeline.run(iter(ROWS)) == len(ROWS)
+    assert pipeline.failed_ids == []
+    assert table.count_rows() == len(ROWS)
+
+
+def test_a_bad_row_is_isolated_from_its_batch(table):
+    bad_id = document_id(ROWS[7])
+    pipeline = IngestionPipeline(FlakyTable(table, bad_id=bad_id), batch_size=16, max_retries=1, retry_backoff=0)
+    assert pipeline.run(iter(ROWS)) == len(ROWS) - 1
+    assert pipeline.failed_ids == [bad_id]
+    assert table.count_rows() == len(ROWS) - 1
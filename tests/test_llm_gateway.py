@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# The gateway builds a ChatOllama client, no server is contacted by these tests
+pytest.importorskip("langchain_ollama")
+
+from lancedb.embeddings.ollama import OllamaEmbeddings
+
+from src.llm_gateway import LLMGateway
+
+
+class CountingEmbeddings(OllamaEmbeddings):
+    """
+    Ollama embedding function that answers locally and records the size of every call.
+    """
+
+    def generate_embeddings(self, texts):
+        calls.append(len(texts))
+        release.wait(5)
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+calls = []
+release = threading.Event()
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    calls.clear()
+    release.clear()
+
+
+def test_concurrent_query_embeddings_are_batched():
+    gateway = LLMGateway(max_concurrency=2)
+    gateway.embed_batch_wait = 0.05
+    embeddings = CountingEmbeddings()
+    texts = [f"movie {'x' * i}" for i in range(20)]
+    with ThreadPoolExecutor(max_workers=len(texts)) as executor:
+        futures = [executor.submit(gateway.embed_query, embeddings, text) for text in texts]
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert results == [[float(len(text)), 1.0] for text in texts]
+    assert sum(calls) == len(texts)
+    assert len(calls) < len(texts)
+    assert gateway.stats()["embed_batch"]["requests"] == len(texts)
+
+
+def test_cancelled_async_request_does_not_hold_a_slot():
+    gateway = LLMGateway(max_concurrency=1)
+    embeddings = CountingEmbeddings()
+
+    async def cancel_while_embedding():
+        task = asyncio.ensure_future(gateway.async_embed_query(embeddings, "the godfather"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_while_embedding())
+    release.set()
+    assert gateway.embed_query(embeddings, "heat") == [4.0, 1.0]
+    assert gateway.slots.acquire(timeout=1)